@@ -1,21 +1,113 @@
 import os
+import re
+from typing import List
+
+from .scan_engine import get_scan_engine
+from .symbol_index import Symbol, get_symbol_index
+from .tree_sitter_support import get_parser, node_text
+
+FUNC_RE = re.compile(r"^func\s+(?:\(\s*\w*\s*\*?\s*(\w+)[^)]*\)\s*)?(\w+)\s*[\[(]")
+TYPE_RE = re.compile(r"^type\s+(\w+)\s+(?:struct|interface)\b")
+CALL_RE = re.compile(r"\b(\w+)\s*\(")
+KEYWORDS = {"if", "for", "switch", "select", "func", "return", "go", "defer", "case", "range"}
+
+
+def _receiver_type(receiver) -> str:
+    # (s *Server) / (s Server) / (s *Cache[K, V]) -> the first type identifier
+    stack = [receiver]
+    while stack:
+        node = stack.pop()
+        if node.type == "type_identifier":
+            return node_text(node)
+        stack.extend(reversed(node.children))
+    return ""
+
+
+def extract_symbols_tree_sitter(source: bytes) -> List[Symbol]:
+    """
+    Types, funcs, methods and call sites from a tree-sitter parse, with calls
+    attributed to their enclosing func (or Receiver.method).
+    """
+    tree = get_parser("go").parse(source)
+    symbols: List[Symbol] = []
+    stack = [(tree.root_node, "")]
+    while stack:
+        node, container = stack.pop()
+        line = node.start_point[0] + 1
+        if node.type == "function_declaration":
+            container = node_text(node.child_by_field_name("name"))
+            symbols.append(("function", container, "", line))
+        elif node.type == "method_declaration":
+            name = node_text(node.child_by_field_name("name"))
+            receiver = _receiver_type(node.child_by_field_name("receiver"))
+            container = f"{receiver}.{name}" if receiver else name
+            symbols.append(("method", name, receiver, line))
+        elif node.type == "type_spec":
+            type_node = node.child_by_field_name("type")
+            if type_node is not None and type_node.type in ("struct_type", "interface_type"):
+                symbols.append(("type", node_text(node.child_by_field_name("name")), "", line))
+        elif node.type == "call_expression":
+            func = node.child_by_field_name("function")
+            if func is not None and func.type == "selector_expression":
+                func = func.child_by_field_name("field")
+            if func is not None and func.type in ("identifier", "field_identifier"):
+                symbols.append(("call", node_text(func), container, line))
+        stack.extend((child, container) for child in reversed(node.children))
+    return symbols
+
+
+def extract_symbols(fpath: str) -> List[Symbol]:
+    """
+    Uses tree-sitter when it is installed, otherwise the line-based fallback below.
+    """
+    if get_parser("go") is not None:
+        with open(fpath, "rb") as f:
+            return extract_symbols_tree_sitter(f.read())
+    return extract_symbols_regex(fpath)
+
+
+def extract_symbols_regex(fpath: str) -> List[Symbol]:
+    """
+    Line-based extraction of types, funcs/methods and call sites. Calls are
+    attributed to the most recent top-level func, which matches gofmt'd code.
+    """
+    symbols: List[Symbol] = []
+    container = ""
+    with open(fpath, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            m = FUNC_RE.match(line)
+            if m:
+                receiver, name = m.groups()
+                symbols.append(("method" if receiver else "function", name, receiver or "", lineno))
+                container = f"{receiver}.{name}" if receiver else name
+                continue
+            m = TYPE_RE.match(line)
+            if m:
+                symbols.append(("type", m.group(1), "", lineno))
+                continue
+            for call in CALL_RE.findall(line):
+                if call not in KEYWORDS:
+                    symbols.append(("call", call, container, lineno))
+    return symbols
+
 
 # ─────────────────────────────────────────────────────────────
-# Go AST Tool (dummy stub — real version needs go/parser or gopls)
+# Go AST Tool (tree-sitter, with a line-based fallback)
 # ─────────────────────────────────────────────────────────────
 class GoASTTool:
-    def __init__(self, root_dir):
+    LANGUAGE = "go"
+    EXTENSIONS = (".go",)
+
+    def __init__(self, root_dir, workers=None):
         self.root = os.path.abspath(root_dir)
+        self.index = get_symbol_index(self.root)
+        self.engine = get_scan_engine(workers)
 
     def search(self, query: str) -> str:
-        results = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(".go"):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                with open(fpath, encoding="utf-8") as f:
-                    code = f.read()
-                if query.lower() in code.lower():
-                    results.append(f"Possible match in {fpath}")
-        return "\n".join(results) if results else "No Go matches found."
\ No newline at end of file
+        version = "tree-sitter-1" if get_parser("go") is not None else "regex-1"
+        self.index.refresh(self.LANGUAGE, self.EXTENSIONS, extract_symbols, self.engine, version=version)
+        results = [
+            f"{kind} `{name}` in {container or '<top level>'} at {fpath} (line {line})"
+            for fpath, kind, name, container, line in self.index.search(self.LANGUAGE, query)
+        ]
+        return "\n".join(results) if results else "No Go matches found."
@@ -1,38 +1,53 @@
 import os
 import javalang
+from typing import List
+
+from .parse_cache import ParseCache
+from .scan_engine import get_scan_engine
+from .symbol_index import Symbol, get_symbol_index
+
+PARSE_CACHE = ParseCache("java", javalang.parse.parse)
+
+
+def extract_symbols(fpath: str) -> List[Symbol]:
+    """
+    Type declarations, methods and method invocations of one Java file.
+    Invocations carry `Class.method` as their container.
+    """
+    tree = PARSE_CACHE.get(fpath)
+
+    symbols: List[Symbol] = []
+    for cls in tree.types:
+        symbols.append(("class", cls.name, "", cls.position.line if cls.position else 0))
+        if not isinstance(cls, javalang.tree.ClassDeclaration):
+            continue
+        for method in cls.methods:
+            method_line = method.position.line if method.position else 0
+            symbols.append(("method", method.name, cls.name, method_line))
+            if method.body is None:
+                continue
+            for _, node in method.filter(javalang.tree.MethodInvocation):
+                line = node.position.line if node.position else method_line
+                symbols.append(("call", node.member, f"{cls.name}.{method.name}", line))
+    return symbols
 
 
 # ─────────────────────────────────────────────────────────────
 # Java AST Tool
 # ─────────────────────────────────────────────────────────────
 class JavaASTTool:
-    def __init__(self, root_dir):
+    LANGUAGE = "java"
+    EXTENSIONS = (".java",)
+
+    def __init__(self, root_dir, workers=None):
         self.root = os.path.abspath(root_dir)
+        self.index = get_symbol_index(self.root)
+        self.engine = get_scan_engine(workers)
 
     def search(self, query: str) -> str:
-        matches = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(".java"):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    code = open(fpath, encoding="utf-8").read()
-                    tree = javalang.parse.parse(code)
-                except Exception:
-                    continue
-
-                for cls in tree.types:
-                    if not isinstance(cls, javalang.tree.ClassDeclaration):
-                        continue
-                    for method in cls.methods:
-                        if method.body is None:
-                            continue
-                        for _, node in method.filter(javalang.tree.MethodInvocation):
-                            if query.lower() in node.member.lower():
-                                matches.append(f"{cls.name}.{method.name} in {fpath} (line {method.position.line})")
+        self.index.refresh(self.LANGUAGE, self.EXTENSIONS, extract_symbols, self.engine)
+        matches = [
+            f"{container} in {fpath} (line {line})"
+            for fpath, _, _, container, line in self.index.search(self.LANGUAGE, query, kinds=("call",))
+        ]
         return "\n".join(matches) if matches else "No matching method invocations found."
-
-
-
-
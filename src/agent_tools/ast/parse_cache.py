@@ -0,0 +1,102 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from cachetools import LRUCache
+
+from ..disk_cache import DiskLRUCache
+from .symbol_index import DEFAULT_INDEX_DIR
+
+
+# ─────────────────────────────────────────────────────────────
+# Parse Cache: parsed trees keyed by (path, mtime, size)
+# ─────────────────────────────────────────────────────────────
+class ParseCache:
+    """
+    Two-tier cache for parsed syntax trees.
+
+    The memory tier is an LRU capped at `max_items` trees; the disk tier is a
+    DiskLRUCache at `<cache_dir>/parse_cache_<name>.sqlite` holding one pickled
+    tree per source file, capped at `max_bytes` with least-recently-used
+    eviction. An entry is valid only while the file's mtime and size match
+    what was recorded at parse time.
+
+    Extraction usually runs in ScanEngine worker processes, so the hit and
+    miss counters only cover lookups made in the current process.
+    """
+
+    def __init__(self, name: str, parser: Callable[[str], Any], max_items: int = 512,
+                 cache_dir: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.parser = parser
+        self.name = name
+        self.cache_dir = cache_dir or DEFAULT_INDEX_DIR
+        self.max_bytes = max_bytes
+        self.memory: LRUCache = LRUCache(maxsize=max_items)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._disk: Optional[DiskLRUCache] = None
+        self._disk_pid: Optional[int] = None
+
+    def _disk_cache(self) -> Optional[DiskLRUCache]:
+        # Opened per process: SQLite connections must not cross into forked workers
+        with self._lock:
+            if self._disk_pid != os.getpid():
+                self._disk_pid = os.getpid()
+                try:
+                    # Workers share the file and may idle between scans, so never leave a batch open
+                    self._disk = DiskLRUCache(f"parse_cache_{self.name}", self.max_bytes, self.cache_dir,
+                                              commit_every=1)
+                except Exception:
+                    self._disk = None
+            return self._disk
+
+    def get(self, fpath: str) -> Any:
+        """
+        Returns the parsed tree for `fpath`, parsing only on a miss in both tiers.
+        Parse errors propagate to the caller and are not cached.
+        """
+        stat = os.stat(fpath)
+        key = (fpath, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if key in self.memory:
+                self.hits += 1
+                return self.memory[key]
+
+        disk = self._disk_cache()
+        try:
+            cached = disk.get(fpath) if disk is not None else None
+        except Exception:
+            cached = None
+        if cached is not None and cached[0] == key:
+            with self._lock:
+                self.disk_hits += 1
+                self.memory[key] = cached[1]
+            return cached[1]
+
+        with open(fpath, encoding="utf-8") as f:
+            tree = self.parser(f.read())
+        with self._lock:
+            self.misses += 1
+            self.memory[key] = tree
+        if disk is not None:
+            try:
+                disk.put(fpath, (key, tree))
+            except Exception:
+                # Very deep trees can exceed the pickler's recursion limit, and a busy
+                # database from another worker is not worth waiting for; keep them in memory only
+                pass
+        return tree
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self.memory),
+            }
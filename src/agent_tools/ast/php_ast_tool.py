@@ -1,22 +1,155 @@
 import os
+import re
+from typing import List
+
+from .scan_engine import get_scan_engine
+from .symbol_index import Symbol, get_symbol_index
+
+PHP_OPEN_RE = re.compile(r"<\?(?:php\b|=)", re.IGNORECASE)
+TOKEN_RE = re.compile(
+    r"(?P<comment>(?://|#)(?:[^\n?]|\?(?!>))*|/\*.*?\*/)"
+    r"|(?P<heredoc><<<[ \t]*(?P<quote>[\"']?)(?P<label>[A-Za-z_]\w*)(?P=quote)\r?\n.*?^[ \t]*(?P=label)\b)"
+    r"|(?P<string>'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\")"
+    r"|(?P<variable>\$\w+)"
+    r"|(?P<name>\\?[A-Za-z_][\w\\]*)"
+    r"|(?P<close>\?>)"
+    r"|(?P<op>\?->|->|::|[(){};])",
+    re.DOTALL | re.MULTILINE,
+)
+CLASS_KEYWORDS = {"class", "interface", "trait", "enum"}
+INCLUDE_KEYWORDS = {"require", "include", "require_once", "include_once"}
+KEYWORDS = {"if", "elseif", "else", "for", "foreach", "while", "do", "switch", "case", "catch", "try",
+            "function", "fn", "array", "isset", "empty", "unset", "list", "return", "echo", "print",
+            "new", "public", "private", "protected", "static", "abstract", "final", "const", "use",
+            "namespace", "extends", "implements", "as", "instanceof", "null", "true", "false",
+            "self", "parent", "this", "throw", "break", "continue", "default", "global", "var",
+            "and", "or", "not", "match", "yield", "readonly"} | CLASS_KEYWORDS | INCLUDE_KEYWORDS
+
+
+def tokenize(source: str):
+    """
+    Yields (kind, text, line) for the tokens the extractor cares about.
+    Only code between `<?php`/`<?=` and `?>` is tokenized, so inline HTML is
+    skipped; heredoc/nowdoc bodies come back as one string token. Comments
+    are dropped so identifiers inside them are not indexed.
+    """
+    line = 1
+    last = 0
+    pos = 0
+    while True:
+        opened = PHP_OPEN_RE.search(source, pos)
+        if not opened:
+            return
+        pos = len(source)
+        for m in TOKEN_RE.finditer(source, opened.end()):
+            line += source.count("\n", last, m.start())
+            last = m.start()
+            kind = m.lastgroup
+            if kind == "close":
+                pos = m.end()
+                break
+            if kind == "heredoc":
+                kind = "string"
+            if kind != "comment":
+                yield kind, m.group(), line
+
+
+def extract_symbols(fpath: str) -> List[Symbol]:
+    """
+    Token-based extraction of classes, functions/methods, calls, method calls,
+    instantiations and includes, plus one `identifier` row per distinct
+    identifier per line so plain identifier lookups never touch the source.
+    """
+    with open(fpath, encoding="utf-8", errors="replace") as f:
+        tokens = list(tokenize(f.read()))
+
+    symbols: List[Symbol] = []
+    seen_identifiers = set()
+    scopes = []  # (kind, name, brace depth at which the scope's body opened)
+    pending = None  # class/function declared but whose body has not opened yet
+    depth = 0
+
+    def container(kind: str) -> str:
+        for scope_kind, name, _ in reversed(scopes):
+            if scope_kind == kind:
+                return name
+        return ""
+
+    def current() -> str:
+        cls, func = container("class"), container("function")
+        if cls and func:
+            return f"{cls}::{func}"
+        return func or cls
+
+    for i, (kind, text, line) in enumerate(tokens):
+        prev = tokens[i - 1][1] if i > 0 else ""
+        nxt = tokens[i + 1][1] if i + 1 < len(tokens) else ""
+
+        if kind == "op":
+            if text == "{":
+                depth += 1
+                if pending:
+                    scopes.append((pending[0], pending[1], depth))
+                    pending = None
+            elif text == "}":
+                if scopes and scopes[-1][2] == depth:
+                    scopes.pop()
+                depth -= 1
+            elif text == ";" and pending and pending[0] == "function":
+                pending = None  # abstract or interface method without a body
+            continue
+        if kind != "name":
+            continue
+
+        lower = text.lower()
+        if lower in CLASS_KEYWORDS and i + 1 < len(tokens) and tokens[i + 1][0] == "name" and prev != "::":
+            pending = ("class", nxt)
+            symbols.append(("class", nxt, "", line))
+        elif lower == "function" and i + 1 < len(tokens) and tokens[i + 1][0] == "name":
+            pending = ("function", nxt)
+            symbols.append(("function", nxt, container("class"), line))
+        elif lower in INCLUDE_KEYWORDS:
+            target = next((t for k, t, _ in tokens[i + 1:i + 3] if k == "string"), None)
+            if target:
+                symbols.append(("include", target[1:-1], current(), line))
+        elif lower not in KEYWORDS and prev.lower() not in CLASS_KEYWORDS | {"function"}:
+            if prev.lower() == "new":
+                symbols.append(("new", text, current(), line))
+            elif nxt == "(":
+                symbols.append(("method_call" if prev in ("->", "?->", "::") else "call", text, current(), line))
+            if (lower, line) not in seen_identifiers:
+                seen_identifiers.add((lower, line))
+                symbols.append(("identifier", text, current(), line))
+    return symbols
 
 
 # ─────────────────────────────────────────────────────────────
-# PHP AST Tool (basic grep-style for now)
+# PHP AST Tool (token-based, backed by the symbol index)
 # ─────────────────────────────────────────────────────────────
 class PHPASTTool:
-    def __init__(self, root_dir):
+    LANGUAGE = "php"
+    EXTENSIONS = (".php",)
+    STRUCTURAL_KINDS = ("class", "function", "call", "method_call", "new", "include")
+
+    def __init__(self, root_dir, workers=None):
         self.root = os.path.abspath(root_dir)
+        self.index = get_symbol_index(self.root)
+        self.engine = get_scan_engine(workers)
 
-    def search(self, query: str) -> str:
-        results = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(".php"):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                with open(fpath, encoding="utf-8") as f:
-                    code = f.read()
-                if query.lower() in code.lower():
-                    results.append(f"Found in {fpath}")
+    def search(self, query: str, mode: str = "structural") -> str:
+        """
+        mode="structural" matches declarations, calls and includes; when that
+        finds nothing, or with mode="identifier", any identifier occurrence
+        (constants, properties, type hints, ...) is returned instead.
+        """
+        self.index.refresh(self.LANGUAGE, self.EXTENSIONS, extract_symbols, self.engine, version="tokens-2")
+        rows = []
+        if mode == "structural":
+            rows = self.index.search(self.LANGUAGE, query, kinds=self.STRUCTURAL_KINDS)
+        if not rows:
+            rows = self.index.search(self.LANGUAGE, query, kinds=("identifier",))
+        results = [
+            f"{kind} `{name}` in {container or '<top level>'} at {fpath} (line {line})"
+            for fpath, kind, name, container, line in rows
+        ]
         return "\n".join(results) if results else "No PHP matches found."
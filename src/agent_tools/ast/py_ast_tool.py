@@ -1,29 +1,56 @@
 import os
 import ast
+from typing import List
+
+from .scan_engine import get_scan_engine
+from .symbol_index import Symbol, get_symbol_index
+
+
+def extract_symbols(fpath: str) -> List[Symbol]:
+    """
+    Classes, functions and call sites of one Python file, each with the
+    name of its enclosing class/function.
+    """
+    with open(fpath, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    symbols: List[Symbol] = []
+
+    def visit(node, container: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                symbols.append(("class", child.name, container, child.lineno))
+                visit(child, child.name)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append(("function", child.name, container, child.lineno))
+                visit(child, f"{container}.{child.name}" if container else child.name)
+            else:
+                if isinstance(child, ast.Call):
+                    func = getattr(child.func, 'id', getattr(child.func, 'attr', ''))
+                    if func:
+                        symbols.append(("call", func, container, child.lineno))
+                visit(child, container)
+
+    visit(tree, "")
+    return symbols
 
 
 # ─────────────────────────────────────────────────────────────
 # Python AST Tool
 # ─────────────────────────────────────────────────────────────
 class PyASTTool:
-    def __init__(self, root_dir):
+    LANGUAGE = "python"
+    EXTENSIONS = (".py",)
+
+    def __init__(self, root_dir, workers=None):
         self.root = os.path.abspath(root_dir)
+        self.index = get_symbol_index(self.root)
+        self.engine = get_scan_engine(workers)
 
     def search(self, query: str) -> str:
-        results = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(".py"):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8") as f:
-                        tree = ast.parse(f.read())
-                except Exception:
-                    continue
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.Call):
-                        func = getattr(node.func, 'id', getattr(node.func, 'attr', ''))
-                        if query.lower() in func.lower():
-                            results.append(f"Call to `{func}` in {fpath} (line {node.lineno})")
-        return "\n".join(results) if results else "No Python call matches found."
\ No newline at end of file
+        self.index.refresh(self.LANGUAGE, self.EXTENSIONS, extract_symbols, self.engine)
+        results = [
+            f"Call to `{name}` in {fpath} (line {line})"
+            for fpath, _, name, _, line in self.index.search(self.LANGUAGE, query, kinds=("call",))
+        ]
+        return "\n".join(results) if results else "No Python call matches found."
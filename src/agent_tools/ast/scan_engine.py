@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def _run_chunk(func: Callable[[Any], Any], items: Sequence[Any], default: Any) -> List[Any]:
+    # Runs in a worker process; one failing file must not sink the whole chunk
+    results = []
+    for item in items:
+        try:
+            results.append(func(item))
+        except Exception:
+            results.append(default)
+    return results
+
+
+# ─────────────────────────────────────────────────────────────
+# Scan Engine: fan per-file parsing out to a process pool
+# ─────────────────────────────────────────────────────────────
+class ScanEngine:
+    """
+    Maps a module-level function over many files in a ProcessPoolExecutor.
+
+    Work is submitted in chunks of `chunk_size` items to keep IPC overhead low,
+    and results come back in input order regardless of which worker finished
+    first. Small batches run in-process, since starting workers would cost more
+    than the parsing itself.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 64):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def map(self, func: Callable[[Any], Any], items: Sequence[Any], default: Any = None) -> List[Any]:
+        """
+        Returns [func(item) for item in items], with `default` in place of any
+        item whose call raised.
+        """
+        if self.workers <= 1 or len(items) <= self.chunk_size:
+            return _run_chunk(func, items, default)
+
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_run_chunk, func, items[i:i + self.chunk_size], default)
+            for i in range(0, len(items), self.chunk_size)
+        ]
+        results: List[Any] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_engines: Dict[Tuple[int, int], ScanEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_scan_engine(workers: Optional[int] = None, chunk_size: int = 64) -> ScanEngine:
+    """
+    Shares one worker pool per (workers, chunk_size) across all AST tools.
+    """
+    key = (workers or os.cpu_count() or 1, chunk_size)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = ScanEngine(*key)
+        return _engines[key]
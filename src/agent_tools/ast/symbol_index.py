@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .scan_engine import ScanEngine
+
+DEFAULT_INDEX_DIR = ".cache"
+SKIP_DIRS = {".git", ".cache", "node_modules"}
+
+# (kind, name, container, line) — container is the enclosing class/function, or "" at top level
+Symbol = Tuple[str, str, str, int]
+Extractor = Callable[[str], List[Symbol]]
+
+
+def walk_files(root: str, extensions: Sequence[str]) -> Iterable[str]:
+    for dirpath, dirnames, files in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for fname in files:
+            if fname.endswith(tuple(extensions)):
+                yield os.path.join(dirpath, fname)
+
+
+def _extract_or_empty(extractor: Extractor, fpath: str) -> List[Symbol]:
+    try:
+        return extractor(fpath)
+    except Exception:
+        return []
+
+
+# ─────────────────────────────────────────────────────────────
+# Symbol Index: shared SQLite store of classes, methods and call sites
+# ─────────────────────────────────────────────────────────────
+class SymbolIndex:
+    """
+    On-disk symbol table shared by all AST tools.
+
+    Each language is refreshed lazily: files are re-extracted only when their
+    mtime or size changed, and at most once per `refresh_interval` seconds, so
+    repeated tool calls inside one agent run are answered straight from SQLite.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            language TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS symbols (
+            path TEXT NOT NULL,
+            language TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            name_lower TEXT NOT NULL,
+            container TEXT NOT NULL,
+            line INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS extractors (
+            language TEXT PRIMARY KEY,
+            version TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_files_language ON files(language);
+        CREATE INDEX IF NOT EXISTS idx_symbols_path ON symbols(path);
+        CREATE INDEX IF NOT EXISTS idx_symbols_lookup ON symbols(language, kind, name_lower);
+        CREATE INDEX IF NOT EXISTS idx_symbols_prefix ON symbols(language, name_lower);
+        CREATE VIRTUAL TABLE IF NOT EXISTS symbol_names USING fts5(
+            name_lower, content='symbols', content_rowid='rowid', tokenize='trigram'
+        );
+        CREATE TRIGGER IF NOT EXISTS symbols_names_insert AFTER INSERT ON symbols BEGIN
+            INSERT INTO symbol_names (rowid, name_lower) VALUES (new.rowid, new.name_lower);
+        END;
+        CREATE TRIGGER IF NOT EXISTS symbols_names_delete AFTER DELETE ON symbols BEGIN
+            INSERT INTO symbol_names (symbol_names, rowid, name_lower) VALUES ('delete', old.rowid, old.name_lower);
+        END;
+    """
+    # Substrings shorter than a trigram cannot use the FTS table; they match as prefixes instead
+    MIN_SUBSTRING = 3
+
+    def __init__(self, root: str, db_path: Optional[str] = None, refresh_interval: float = 30.0):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(DEFAULT_INDEX_DIR, "symbol_index.sqlite")
+        self.refresh_interval = refresh_interval
+        self._last_refresh: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        has_names = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'symbol_names'").fetchone() is not None
+        self.conn.executescript(self.SCHEMA)
+        if not has_names:
+            # Index built before the trigram table existed: fill it from the symbols already stored
+            with self.conn:
+                self.conn.execute("INSERT INTO symbol_names (symbol_names) VALUES ('rebuild')")
+
+    def refresh(self, language: str, extensions: Sequence[str], extractor: Extractor,
+                engine: Optional[ScanEngine] = None, force: bool = False,
+                version: str = "1") -> Dict[str, int]:
+        """
+        Brings the rows for one language in line with the files on disk.
+        Changed files are extracted through `engine` when one is given, so a
+        cold build is spread over its worker processes. A different extractor
+        `version` than the one the rows were built with drops them all.
+        Returns counts of updated, removed and unchanged files.
+        """
+        stats = {"updated": 0, "removed": 0, "unchanged": 0}
+        with self._lock:
+            now = time.monotonic()
+            last = self._last_refresh.get(language)
+            if not force and last is not None and now - last < self.refresh_interval:
+                return stats
+
+            self._check_version(language, version)
+            known = {
+                path: (mtime, size)
+                for path, mtime, size in self.conn.execute(
+                    "SELECT path, mtime, size FROM files WHERE language = ? AND path LIKE ?",
+                    (language, self.root + os.sep + "%"),
+                )
+            }
+            changed = []
+            for fpath in walk_files(self.root, extensions):
+                try:
+                    stat = os.stat(fpath)
+                except OSError:
+                    continue
+                if known.pop(fpath, None) == (stat.st_mtime, stat.st_size):
+                    stats["unchanged"] += 1
+                else:
+                    changed.append((fpath, stat))
+            changed.sort()
+
+            paths = [fpath for fpath, _ in changed]
+            if engine is not None:
+                extracted = engine.map(extractor, paths, default=[])
+            else:
+                extracted = [_extract_or_empty(extractor, fpath) for fpath in paths]
+
+            with self.conn:
+                for fpath in known:
+                    self._delete_file(fpath)
+                    stats["removed"] += 1
+                for (fpath, stat), symbols in zip(changed, extracted):
+                    self._store_file(fpath, language, stat, symbols)
+                    stats["updated"] += 1
+
+            self._last_refresh[language] = time.monotonic()
+        return stats
+
+    def _check_version(self, language: str, version: str) -> None:
+        row = self.conn.execute("SELECT version FROM extractors WHERE language = ?", (language,)).fetchone()
+        if row and row[0] == version:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM symbols WHERE language = ?", (language,))
+            self.conn.execute("DELETE FROM files WHERE language = ?", (language,))
+            self.conn.execute("INSERT OR REPLACE INTO extractors (language, version) VALUES (?, ?)",
+                              (language, version))
+
+    def _delete_file(self, path: str) -> None:
+        self.conn.execute("DELETE FROM symbols WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _store_file(self, path: str, language: str, stat: os.stat_result, symbols: List[Symbol]) -> None:
+        self._delete_file(path)
+        self.conn.execute(
+            "INSERT INTO files (path, language, mtime, size) VALUES (?, ?, ?, ?)",
+            (path, language, stat.st_mtime, stat.st_size),
+        )
+        self.conn.executemany(
+            "INSERT INTO symbols (path, language, kind, name, name_lower, container, line) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, language, kind, name, name.lower(), container, line)
+             for kind, name, container, line in symbols],
+        )
+
+    def search(self, language: str, query: str, kinds: Optional[Sequence[str]] = None,
+               limit: int = 500) -> List[Tuple[str, str, str, str, int]]:
+        """
+        Case-insensitive substring match on symbol names, answered from the
+        trigram table; queries shorter than three characters match name
+        prefixes through idx_symbols_prefix instead.
+        Returns (path, kind, name, container, line) ordered by path and line.
+        """
+        needle = query.lower()
+        if len(needle) >= self.MIN_SUBSTRING:
+            sql = ("SELECT s.path, s.kind, s.name, s.container, s.line FROM symbol_names "
+                   "JOIN symbols s ON s.rowid = symbol_names.rowid "
+                   "WHERE symbol_names MATCH ? AND s.language = ? AND s.path LIKE ?")
+            params: List = ['"' + needle.replace('"', '""') + '"', language, self.root + os.sep + "%"]
+        else:
+            sql = ("SELECT s.path, s.kind, s.name, s.container, s.line FROM symbols s "
+                   "WHERE s.language = ? AND s.name_lower >= ? AND s.name_lower < ? AND s.path LIKE ?")
+            params = [language, needle, needle + "\U0010ffff", self.root + os.sep + "%"]
+        if kinds:
+            sql += f" AND s.kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        sql += " ORDER BY s.path, s.line LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_symbol_index(root: str) -> SymbolIndex:
+    """
+    One SymbolIndex per database file per process, shared by every AST tool.
+    """
+    db_path = os.path.abspath(os.path.join(DEFAULT_INDEX_DIR, "symbol_index.sqlite"))
+    key = f"{db_path}|{os.path.abspath(root)}"
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SymbolIndex(root, db_path)
+        return _indexes[key]
@@ -0,0 +1,35 @@
+from typing import Dict, Optional
+
+try:
+    from tree_sitter import Language, Parser
+except ImportError:  # tree-sitter is optional; tools fall back to line-based extraction
+    Language = Parser = None
+
+_GRAMMARS = {
+    "typescript": ("tree_sitter_typescript", "language_typescript"),
+    "go": ("tree_sitter_go", "language"),
+}
+_parsers: Dict[str, Optional["Parser"]] = {}
+
+
+def get_parser(name: str) -> Optional["Parser"]:
+    """
+    Returns a cached tree-sitter parser for `name`, or None when tree-sitter or
+    the grammar package is not installed. Parsers are per process, so each
+    scan worker builds its own on first use.
+    """
+    if name not in _parsers:
+        parser = None
+        if Parser is not None:
+            module_name, attr = _GRAMMARS[name]
+            try:
+                module = __import__(module_name)
+                parser = Parser(Language(getattr(module, attr)()))
+            except ImportError:
+                parser = None
+        _parsers[name] = parser
+    return _parsers[name]
+
+
+def node_text(node) -> str:
+    return node.text.decode("utf-8", errors="replace") if node is not None else ""
@@ -1,23 +1,174 @@
+import hashlib
 import os
 import re
+from typing import Dict, List
+
+from .scan_engine import get_scan_engine
+from .symbol_index import Symbol, get_symbol_index
+from .tree_sitter_support import get_parser, node_text
+
+CLASS_RE = re.compile(r"\b(?:class|interface)\s+(\w+)")
+FUNCTION_RE = re.compile(r"\bfunction\s*\*?\s*(\w+)\s*[<(]")
+ARROW_RE = re.compile(r"\b(?:const|let)\s+(\w+)\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*(?::[^=]+)?=>")
+METHOD_RE = re.compile(
+    r"^\s*(?:(?:public|private|protected|static|async|readonly|override)\s+)*(\w+)\s*(?:<[^>]*>)?\s*\(.*\)\s*(?::[^{;=]+)?\{\s*$"
+)
+CALL_RE = re.compile(r"\b(\w+)\s*(?:<[^>()]*>)?\s*\(")
+KEYWORDS = {"if", "for", "while", "switch", "catch", "function", "return", "constructor", "super", "typeof", "new"}
+
+CLASS_NODES = {"class_declaration", "abstract_class_declaration", "interface_declaration"}
+FUNCTION_NODES = {"function_declaration", "generator_function_declaration"}
+FUNCTION_VALUES = {"arrow_function", "function_expression", "function"}
+CONDITIONAL_NODES = {"if_statement": "condition", "switch_statement": "value", "ternary_expression": "condition"}
+
+
+def extract_symbols_tree_sitter(source: bytes) -> List[Symbol]:
+    """
+    Classes, functions, methods and call sites from a tree-sitter parse, with
+    calls attributed to their real enclosing function or method.
+    """
+    tree = get_parser("typescript").parse(source)
+    symbols: List[Symbol] = []
+    stack = [(tree.root_node, "", "")]
+    while stack:
+        node, cls, container = stack.pop()
+        line = node.start_point[0] + 1
+        if node.type in CLASS_NODES:
+            cls = node_text(node.child_by_field_name("name"))
+            symbols.append(("class", cls, "", line))
+        elif node.type in FUNCTION_NODES:
+            container = node_text(node.child_by_field_name("name"))
+            symbols.append(("function", container, "", line))
+        elif node.type == "method_definition":
+            name = node_text(node.child_by_field_name("name"))
+            container = f"{cls}.{name}" if cls else name
+            symbols.append(("method", name, cls, line))
+        elif node.type == "variable_declarator":
+            value = node.child_by_field_name("value")
+            if value is not None and value.type in FUNCTION_VALUES:
+                container = node_text(node.child_by_field_name("name"))
+                symbols.append(("function", container, "", line))
+        elif node.type == "call_expression":
+            func = node.child_by_field_name("function")
+            if func is not None and func.type == "member_expression":
+                func = func.child_by_field_name("property")
+            if func is not None and func.type in ("identifier", "property_identifier"):
+                symbols.append(("call", node_text(func), container, line))
+        stack.extend((child, cls, container) for child in reversed(node.children))
+    return symbols
+
+
+def outline_methods(source: bytes) -> Dict[str, dict]:
+    """
+    Per-function/method outline used for structural diffs:
+    {qualified name: {"start", "end", "body_hash", "conditionals": [[kind, text, line], ...]}}.
+    Body hashes ignore whitespace, so reformatting alone is not a change.
+    Requires tree-sitter.
+    """
+    tree = get_parser("typescript").parse(source)
+    outline: Dict[str, dict] = {}
+
+    def add(name: str, node) -> None:
+        key = name
+        n = 2
+        while key in outline:  # overloads / duplicate names
+            key = f"{name}#{n}"
+            n += 1
+        body = node.child_by_field_name("body") or node
+        conditionals = []
+        stack = [body]
+        while stack:
+            child = stack.pop()
+            if child.type in CONDITIONAL_NODES:
+                condition = child.child_by_field_name(CONDITIONAL_NODES[child.type])
+                text = " ".join(node_text(condition).split())
+                if text.startswith("(") and text.endswith(")"):
+                    text = text[1:-1]
+                conditionals.append([child.type.split("_")[0], text, child.start_point[0] + 1])
+            stack.extend(reversed(child.children))
+        outline[key] = {
+            "start": node.start_point[0] + 1,
+            "end": node.end_point[0] + 1,
+            "body_hash": hashlib.sha1(" ".join(node_text(body).split()).encode("utf-8")).hexdigest(),
+            "conditionals": conditionals,
+        }
+
+    stack = [(tree.root_node, "")]
+    while stack:
+        node, cls = stack.pop()
+        if node.type in CLASS_NODES:
+            cls = node_text(node.child_by_field_name("name"))
+        elif node.type in FUNCTION_NODES:
+            add(node_text(node.child_by_field_name("name")), node)
+        elif node.type == "method_definition":
+            name = node_text(node.child_by_field_name("name"))
+            add(f"{cls}.{name}" if cls else name, node)
+        elif node.type == "variable_declarator":
+            value = node.child_by_field_name("value")
+            if value is not None and value.type in FUNCTION_VALUES:
+                add(node_text(node.child_by_field_name("name")), value)
+        stack.extend((child, cls) for child in reversed(node.children))
+    return outline
+
+
+def extract_symbols(fpath: str) -> List[Symbol]:
+    """
+    Uses tree-sitter when it is installed, otherwise the regex fallback below.
+    """
+    if get_parser("typescript") is not None:
+        with open(fpath, "rb") as f:
+            return extract_symbols_tree_sitter(f.read())
+    return extract_symbols_regex(fpath)
+
+
+def extract_symbols_regex(fpath: str) -> List[Symbol]:
+    """
+    Regex-based extraction of classes, functions, methods and call sites.
+    Calls are attributed to the most recently declared function or method.
+    """
+    symbols: List[Symbol] = []
+    cls = ""
+    container = ""
+    with open(fpath, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            m = CLASS_RE.search(line)
+            if m:
+                cls = m.group(1)
+                symbols.append(("class", cls, "", lineno))
+                continue
+            m = FUNCTION_RE.search(line) or ARROW_RE.search(line)
+            if m:
+                container = m.group(1)
+                symbols.append(("function", container, "", lineno))
+                continue
+            m = METHOD_RE.match(line)
+            if m and m.group(1) not in KEYWORDS:
+                container = f"{cls}.{m.group(1)}" if cls else m.group(1)
+                symbols.append(("method", m.group(1), cls, lineno))
+                continue
+            for call in CALL_RE.findall(line):
+                if call not in KEYWORDS:
+                    symbols.append(("call", call, container, lineno))
+    return symbols
+
 
 # ─────────────────────────────────────────────────────────────
-# TypeScript AST Tool (basic — would benefit from ts-morph or tree-sitter)
+# TypeScript AST Tool (tree-sitter, with a regex fallback)
 # ─────────────────────────────────────────────────────────────
 class TypeScriptASTTool:
-    def __init__(self, root_dir):
+    LANGUAGE = "ts"
+    EXTENSIONS = (".ts",)
+
+    def __init__(self, root_dir, workers=None):
         self.root = os.path.abspath(root_dir)
+        self.index = get_symbol_index(self.root)
+        self.engine = get_scan_engine(workers)
 
     def search(self, query: str) -> str:
-        results = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(".ts"):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                with open(fpath, encoding="utf-8") as f:
-                    code = f.read()
-                matches = re.findall(rf"\b{re.escape(query)}\b", code)
-                if matches:
-                    results.append(f"{len(matches)} hits in {fpath}")
-        return "\n".join(results) if results else "No TS matches found."
\ No newline at end of file
+        version = "tree-sitter-1" if get_parser("typescript") is not None else "regex-1"
+        self.index.refresh(self.LANGUAGE, self.EXTENSIONS, extract_symbols, self.engine, version=version)
+        results = [
+            f"{kind} `{name}` in {container or '<top level>'} at {fpath} (line {line})"
+            for fpath, kind, name, container, line in self.index.search(self.LANGUAGE, query)
+        ]
+        return "\n".join(results) if results else "No TS matches found."
@@ -0,0 +1,148 @@
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = ".cache"
+
+
+# ─────────────────────────────────────────────────────────────
+# Disk LRU Cache: size-capped pickle store in SQLite
+# ─────────────────────────────────────────────────────────────
+class DiskLRUCache:
+    """
+    Persistent key/value cache with least-recently-used eviction.
+
+    Values are pickled; once the stored bytes exceed `max_bytes`, the entries
+    with the oldest last access are evicted until the cache is back to 90% of
+    the cap, so eviction does not run on every put. The stored size is kept as
+    a running total.
+
+    Puts and access-time updates are buffered in memory and written in one
+    short transaction once `commit_every` of them are pending or
+    `commit_interval` seconds have passed, so a burst of puts costs one commit
+    rather than one each, and no write lock is held between calls: other
+    processes sharing the file never wait on a half-finished batch. Call
+    `flush()` once an operation is done to persist what is still buffered.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+    """
+
+    def __init__(self, name: str, max_bytes: int = 512 * 1024 * 1024, cache_dir: Optional[str] = None,
+                 commit_every: int = 256, commit_interval: float = 1.0):
+        self.path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{name}.sqlite")
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._puts: Dict[str, bytes] = {}  # key -> pickled value, not yet written
+        self._touched: Dict[str, float] = {}  # key -> last access, not yet written
+        self._last_commit = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # a cache can lose its last commits on power loss
+        self.conn.executescript(self.SCHEMA)
+        self._total = self._stored_bytes()
+        atexit.register(self.flush)
+
+    def _stored_bytes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _wrote(self) -> None:
+        # Caller holds the lock
+        pending = len(self._puts) + len(self._touched)
+        if pending >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+            self._commit()
+
+    def _commit(self) -> None:
+        # Caller holds the lock
+        puts, touched = self._puts, self._touched
+        self._puts, self._touched = {}, {}
+        self._last_commit = time.monotonic()
+        if not puts and not touched:
+            return
+        now = time.time()
+        with self.conn:  # one transaction; rolled back (and the batch dropped) if it fails
+            grown = 0
+            for key, blob in puts.items():
+                old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                grown += len(blob) - (old[0] if old else 0)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                [(key, blob, len(blob), now) for key, blob in puts.items()],
+            )
+            self.conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                  [(at, key) for key, at in touched.items() if key not in puts])
+            self._total += grown
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def flush(self) -> None:
+        """
+        Writes any buffered puts and access times.
+        """
+        with self._lock:
+            self._commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            blob = self._puts.get(key)
+            if blob is None:
+                row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                blob = row[0] if row is not None else None
+            if blob is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            self._wrote()
+        return pickle.loads(blob)
+
+    def put(self, key: str, value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            self._puts[key] = blob
+            self._wrote()
+
+    def _evict(self) -> None:
+        # Inside _commit's transaction. Other processes may share the file, so re-read the real total first
+        total = self._stored_bytes()
+        target = int(self.max_bytes * 0.9)
+        if total > self.max_bytes:
+            stale = []
+            for old_key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                if total <= target:
+                    break
+                stale.append((old_key,))
+                total -= size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self._total = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._commit()
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": count,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
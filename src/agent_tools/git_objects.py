@@ -0,0 +1,140 @@
+import atexit
+import os
+import subprocess
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+OBJECT_TYPES = {"blob", "tree", "commit", "tag"}
+
+
+# ─────────────────────────────────────────────────────────────
+# Git Object Reader: one long-lived `git cat-file --batch` per repo
+# ─────────────────────────────────────────────────────────────
+class GitObjectReader:
+    """
+    Reads objects straight from a repository's object database.
+
+    Nothing here touches the working tree or the network, so any number of
+    agents can read different branches of the same repo at the same time.
+    Requests are serialized over a single `git cat-file --batch` pipe, which
+    avoids a process spawn per object.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo = os.path.abspath(repo_path)
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(
+                ["git", "-C", self.repo, "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        return self._proc
+
+    def _read_response(self, proc: subprocess.Popen) -> Optional[Tuple[str, str, bytes]]:
+        header = proc.stdout.readline().decode("utf-8", errors="replace").rstrip("\n")
+        # "<spec> missing" / "<spec> ambiguous", where the spec may itself contain spaces
+        parts = header.rsplit(" ", 2)
+        if len(parts) != 3 or parts[1] not in OBJECT_TYPES or not parts[2].isdigit():
+            return None
+        sha, obj_type, size = parts
+        data = proc.stdout.read(int(size))
+        proc.stdout.read(1)  # trailing newline
+        return sha, obj_type, data
+
+    def read(self, spec: str) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Returns (sha, type, content) for any object spec git understands
+        (`<sha>`, `<ref>`, `<ref>:<path>`), or None if it does not exist.
+        """
+        return self.read_many([spec])[0]
+
+    def read_many(self, specs: Iterable[str]) -> List[Optional[Tuple[str, str, bytes]]]:
+        """
+        Pipelines many requests through the batch process. Requests are written
+        from a helper thread so a large batch cannot deadlock on full pipes.
+        """
+        specs = list(specs)
+        if not specs:
+            return []
+        with self._lock:
+            proc = self._ensure_process()
+
+            def write():
+                for spec in specs:
+                    proc.stdin.write(spec.encode("utf-8") + b"\n")
+                proc.stdin.flush()
+
+            writer = threading.Thread(target=write, daemon=True)
+            writer.start()
+            results = [self._read_response(proc) for _ in specs]
+            writer.join()
+            return results
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """
+        Commit SHA for `ref`, also trying `origin/<ref>` so remote-only
+        branches work without a local checkout.
+        """
+        for candidate in (ref, f"origin/{ref}"):
+            result = self.read(f"{candidate}^{{commit}}")
+            if result is not None:
+                return result[0]
+        return None
+
+    def read_blob(self, ref: str, path: str) -> Optional[bytes]:
+        commit = self.resolve(ref)
+        if commit is None:
+            return None
+        result = self.read(f"{commit}:{path}")
+        return result[2] if result is not None and result[1] == "blob" else None
+
+    def ls_tree(self, ref: str, path: str = "") -> List[Tuple[str, str, str, str]]:
+        """
+        Recursive (mode, type, sha, path) listing of the tree at `ref`.
+        """
+        commit = self.resolve(ref)
+        if commit is None:
+            return []
+        cmd = ["git", "-C", self.repo, "ls-tree", "-r", "-z", commit]
+        if path:
+            cmd += ["--", path]
+        output = subprocess.check_output(cmd).decode("utf-8", errors="replace")
+        entries = []
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, entry_path = record.split("\t", 1)
+            mode, obj_type, sha = meta.split()
+            entries.append((mode, obj_type, sha, entry_path))
+        return entries
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.stdin.close()
+                self._proc.wait()
+            self._proc = None
+
+
+_readers: Dict[str, GitObjectReader] = {}
+_readers_lock = threading.Lock()
+
+
+def get_object_reader(repo_path: str) -> GitObjectReader:
+    """
+    One reader (and one cat-file process) per repository per process.
+    """
+    key = os.path.abspath(repo_path)
+    with _readers_lock:
+        if key not in _readers:
+            _readers[key] = GitObjectReader(key)
+        return _readers[key]
+
+
+@atexit.register
+def _close_readers() -> None:
+    for reader in list(_readers.values()):
+        reader.close()
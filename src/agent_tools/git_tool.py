@@ -1,7 +1,15 @@
+import hashlib
 import os
+import re
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+from .git_objects import get_object_reader
+from .trigram_index import TrigramIndex
+
 
 # ─────────────────────────────────────────────────────────────
 # Git Tool: Switch branch and scan files in repos
@@ -9,6 +17,9 @@ from typing import List
 class GitTool:
     def __init__(self, root_dir: str):
         self.root = Path(root_dir)
+        self._indexes: Dict[str, TrigramIndex] = {}
+        self._indexes_lock = threading.Lock()
+        self._last_fetch: Dict[str, float] = {}
 
     def checkout_branch(self, repo_name: str, branch: str) -> str:
         repo_path = self.root / repo_name
@@ -21,8 +32,180 @@ class GitTool:
         except subprocess.CalledProcessError:
             return f"⚠️ Failed to checkout `{branch}` in `{repo_name}`"
 
-    def grep_file(self, repo_name: str, pattern: str, ext: str = ".ts") -> List[str]:
+    def fetch(self, repo_name: str, min_interval: float = 300.0) -> str:
+        """
+        Updates remote-tracking branches, at most once per `min_interval`
+        seconds per repo. The read-at-ref methods never fetch on their own.
+        """
+        repo_path = self.root / repo_name
+        if not (repo_path / ".git").exists():
+            return f"❌ {repo_name} is not a Git repository."
+        last = self._last_fetch.get(repo_name)
+        if last is not None and time.monotonic() - last < min_interval:
+            return f"✅ `{repo_name}` was fetched recently"
+        try:
+            subprocess.run(["git", "-C", str(repo_path), "fetch"], check=True)
+            self._last_fetch[repo_name] = time.monotonic()
+            return f"✅ Fetched `{repo_name}`"
+        except subprocess.CalledProcessError:
+            return f"⚠️ Failed to fetch `{repo_name}`"
+
+    def read_file_at_ref(self, repo_name: str, ref: str, path: str) -> str:
+        """
+        Contents of `path` on branch/tag/commit `ref`, without checking it out.
+        """
+        data = get_object_reader(str(self.root / repo_name)).read_blob(ref, path)
+        if data is None:
+            return f"❌ `{path}` not found at `{ref}` in `{repo_name}`"
+        return data.decode("utf-8", errors="replace")
+
+    def list_tree_at_ref(self, repo_name: str, ref: str, path: str = "", ext: str = "") -> List[str]:
+        """
+        File paths under `path` on `ref`, optionally filtered by extension.
+        """
+        entries = get_object_reader(str(self.root / repo_name)).ls_tree(ref, path)
+        return [p for _, obj_type, _, p in entries if obj_type == "blob" and p.endswith(ext)]
+
+    def grep_at_ref(self, repo_name: str, ref: str, pattern: str, ext: str = ".ts",
+                    regex: bool = False, max_results: int = 200) -> List[str]:
+        """
+        Like grep_file, but over the tree at `ref` read from the object store.
+        The trigram index is keyed by the resolved commit, and blobs shared
+        with other branches are only indexed once.
+        """
+        repo_path = self.root / repo_name
+        reader = get_object_reader(str(repo_path))
+        commit = reader.resolve(ref)
+        if commit is None:
+            return [f"❌ Unknown ref `{ref}` in `{repo_name}`"]
+
+        index = self._get_index(repo_path)
+        key = f"ref:{ref}"
+        if index.stamp(key) != commit:
+            entries = [(p, sha) for mode, obj_type, sha, p in reader.ls_tree(commit)
+                       if obj_type == "blob" and mode != "120000"]
+            index.sync(key, commit, entries, lambda batch: self._read_objects(reader, batch))
+
+        match = self._matcher(pattern, regex)
+        results = []
+        for path, sha in index.candidates(key, pattern, regex=regex, ext=ext):
+            result = reader.read(sha)
+            if result is None:
+                continue
+            lines = result[2].decode("utf-8", errors="replace").splitlines()
+            for i, line in enumerate(lines, start=1):
+                if match(line):
+                    results.append(f"{repo_name}@{ref}:{path}:{i}: {line.strip()}")
+                    if len(results) >= max_results:
+                        return results
+        return results
+
+    @staticmethod
+    def _matcher(pattern: str, regex: bool):
+        if regex:
+            return re.compile(pattern, re.IGNORECASE).search
+        needle = pattern.lower()
+        return lambda line: needle in line.lower()
+
+    def _get_index(self, repo_path: Path) -> TrigramIndex:
+        key = str(repo_path.resolve())
+        with self._indexes_lock:
+            if key not in self._indexes:
+                self._indexes[key] = TrigramIndex(key)
+            return self._indexes[key]
+
+    @staticmethod
+    def _read_objects(reader, batch: List[Tuple[str, str]]) -> List[Optional[bytes]]:
+        return [result[2] if result is not None and result[1] == "blob" else None
+                for result in reader.read_many(sha for _, sha in batch)]
+
+    def _sync_worktree_index(self, repo_path: Path) -> str:
+        """
+        Re-syncs the trigram index with the checked-out branch whenever
+        .git/index or any file with unstaged changes has changed. Clean files
+        are indexed from the object store under their staged blob SHA. Dirty
+        files are indexed from disk under the SHA of their current contents,
+        so they never pollute postings shared with grep_at_ref. Returns the
+        index key of the checked-out branch.
+        """
+        index = self._get_index(repo_path)
+        head = subprocess.check_output(
+            ["git", "-C", str(repo_path), "rev-parse", "--abbrev-ref", "HEAD"], text=True).strip()
+        key = f"worktree:{head}"
+
+        modified = subprocess.check_output(["git", "-C", str(repo_path), "ls-files", "-m", "-z"], text=True)
+        dirty = {}
+        for path in filter(None, modified.split("\0")):
+            try:
+                stat = (repo_path / path).stat()
+                dirty[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                dirty[path] = None  # deleted from the working tree
+        dirty_digest = hashlib.sha1(repr(sorted(dirty.items())).encode("utf-8")).hexdigest()
+        stamp = f"{(repo_path / '.git' / 'index').stat().st_mtime_ns}:{dirty_digest}"
+        if index.stamp(key) == stamp:
+            return key
+
+        output = subprocess.check_output(["git", "-C", str(repo_path), "ls-files", "-s", "-z"], text=True)
+        entries = []
+        worktree_blobs: Dict[str, bytes] = {}
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, path = record.split("\t", 1)
+            mode, sha, _ = meta.split()
+            if mode == "160000":  # skip submodules
+                continue
+            if path in dirty:
+                try:
+                    data = (repo_path / path).read_bytes()
+                except OSError:
+                    continue
+                sha = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+                worktree_blobs[sha] = data
+            entries.append((path, sha))
+
+        reader = get_object_reader(str(repo_path))
+
+        def read_blobs(batch: List[Tuple[str, str]]) -> List[Optional[bytes]]:
+            stored = self._read_objects(reader, [(p, sha) for p, sha in batch if sha not in worktree_blobs])
+            stored.reverse()
+            return [worktree_blobs[sha] if sha in worktree_blobs else stored.pop() for _, sha in batch]
+
+        index.sync(key, stamp, entries, read_blobs)
+        return key
+
+    def grep_file(self, repo_name: str, pattern: str, ext: str = ".ts",
+                  regex: bool = False, max_results: int = 200) -> List[str]:
+        """
+        Case-insensitive grep over one repo. Candidate files come from the
+        trigram index, so only files that can contain the pattern are read.
+        `regex=True` treats the pattern as a Python regular expression.
+        Stops after `max_results` matching lines.
+        """
         repo_path = self.root / repo_name
+        match = self._matcher(pattern, regex)
+
+        if not (repo_path / ".git").exists():
+            return self._grep_walk(repo_path, match, ext, max_results)
+
+        key = self._sync_worktree_index(repo_path)
+        results = []
+        for path, _ in self._get_index(repo_path).candidates(key, pattern, regex=regex, ext=ext):
+            try:
+                with open(repo_path / path, encoding="utf-8") as f:
+                    for i, line in enumerate(f, start=1):
+                        if match(line):
+                            rel_path = os.path.relpath(repo_path / path, self.root)
+                            results.append(f"{rel_path}:{i}: {line.strip()}")
+                            if len(results) >= max_results:
+                                return results
+            except Exception:
+                continue
+        return results
+
+    def _grep_walk(self, repo_path: Path, match, ext: str, max_results: int) -> List[str]:
+        # Fallback for directories that are not Git repositories
         results = []
         for dirpath, _, files in os.walk(repo_path):
             for fname in files:
@@ -31,9 +214,11 @@ class GitTool:
                 try:
                     with open(os.path.join(dirpath, fname), encoding="utf-8") as f:
                         for i, line in enumerate(f, start=1):
-                            if pattern.lower() in line.lower():
+                            if match(line):
                                 rel_path = os.path.relpath(os.path.join(dirpath, fname), self.root)
                                 results.append(f"{rel_path}:{i}: {line.strip()}")
+                                if len(results) >= max_results:
+                                    return results
                 except Exception:
                     continue
-        return results
\ No newline at end of file
+        return results
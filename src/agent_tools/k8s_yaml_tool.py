@@ -1,40 +1,497 @@
+import json
 import os
+import pickle
 import subprocess
+import threading
+import time
 import yaml
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+# libyaml's C loader is several times faster than the pure-Python one
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SKIP_DIRS = {".git", ".cache", "node_modules"}
+DEFAULT_INVENTORY_PATH = os.path.join(".cache", "k8s_inventory.pkl")
+DEFAULT_SNAPSHOT_PATH = os.path.join(".cache", "k8s_snapshot.json")
+SNAPSHOT_RESOURCE_TYPES = [
+    "namespaces", "nodes", "pods", "services", "endpoints", "configmaps", "secrets",
+    "serviceaccounts", "persistentvolumes", "persistentvolumeclaims", "deployments",
+    "statefulsets", "daemonsets", "replicasets", "jobs", "cronjobs", "ingresses",
+    "horizontalpodautoscalers",
+]
+REDACTED = "<redacted>"
+LAST_APPLIED_ANNOTATION = "kubectl.kubernetes.io/last-applied-configuration"
+KIND_ALIASES = {
+    "po": "pod", "svc": "service", "ep": "endpoints", "cm": "configmap", "ns": "namespace",
+    "no": "node", "sa": "serviceaccount", "pv": "persistentvolume", "pvc": "persistentvolumeclaim",
+    "deploy": "deployment", "sts": "statefulset", "ds": "daemonset", "rs": "replicaset",
+    "cj": "cronjob", "ing": "ingress", "hpa": "horizontalpodautoscaler",
+}
+
+
+def parse_label_selector(selector: str) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    "app=web,tier!=db,canary" -> [("app", "=", "web"), ("tier", "!=", "db"), ("canary", "exists", None)]
+    """
+    requirements = []
+    for part in filter(None, (p.strip() for p in selector.split(","))):
+        if "!=" in part:
+            key, value = part.split("!=", 1)
+            requirements.append((key.strip(), "!=", value.strip()))
+        elif "=" in part:
+            key, value = part.replace("==", "=").split("=", 1)
+            requirements.append((key.strip(), "=", value.strip()))
+        else:
+            requirements.append((part, "exists", None))
+    return requirements
+
+
+def _load_manifest(fpath: str) -> List[Dict]:
+    resources = []
+    with open(fpath, encoding='utf-8') as f:
+        for doc in yaml.load_all(f, Loader=YAML_LOADER):
+            if not isinstance(doc, dict):
+                continue
+            metadata = doc.get('metadata') if isinstance(doc.get('metadata'), dict) else {}
+            labels = metadata.get('labels')
+            resources.append({
+                "kind": doc.get('kind'),
+                "name": metadata.get('name'),
+                "namespace": metadata.get('namespace'),
+                "labels": labels if isinstance(labels, dict) else {},
+                "path": fpath,
+            })
+    return resources
+
+
+# ─────────────────────────────────────────────────────────────
+# Manifest Inventory: parsed YAML resources indexed for lookups
+# ─────────────────────────────────────────────────────────────
+class ManifestInventory:
+    """
+    Every Kubernetes resource found in YAML files under `root`, indexed by
+    kind, namespace, name and label key/value.
+
+    Files are re-parsed only when their mtime or size changes, the walk runs
+    at most once per `refresh_interval` seconds, and the parsed inventory is
+    pickled so a new process does not start from scratch.
+    """
+
+    def __init__(self, root: str, cache_path: str = DEFAULT_INVENTORY_PATH, refresh_interval: float = 30.0):
+        self.root = os.path.abspath(root)
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.files: Dict[str, Tuple[float, int, List[Dict]]] = {}
+        self.resources: List[Dict] = []
+        self.by_kind: Dict[str, Set[int]] = defaultdict(set)
+        self.by_namespace: Dict[str, Set[int]] = defaultdict(set)
+        self.by_name: Dict[str, Set[int]] = defaultdict(set)
+        self.by_label: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        self._last_refresh: Optional[float] = None
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("root") == self.root:
+                self.files = cached["files"]
+                self._rebuild_indexes()
+        except Exception:
+            self.files = {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"root": self.root, "files": self.files}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def _rebuild_indexes(self) -> None:
+        self.resources = [r for path in sorted(self.files) for r in self.files[path][2]]
+        for index in (self.by_kind, self.by_namespace, self.by_name, self.by_label):
+            index.clear()
+        for i, r in enumerate(self.resources):
+            self.by_kind[str(r["kind"]).lower()].add(i)
+            self.by_namespace[str(r["namespace"])].add(i)
+            self.by_name[str(r["name"])].add(i)
+            for key, value in r["labels"].items():
+                self.by_label[(str(key), str(value))].add(i)
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return
+            seen = set()
+            changed = False
+            for dirpath, dirnames, files in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+                for fname in files:
+                    if not fname.endswith(('.yaml', '.yml')):
+                        continue
+                    fpath = os.path.join(dirpath, fname)
+                    seen.add(fpath)
+                    try:
+                        stat = os.stat(fpath)
+                    except OSError:
+                        continue
+                    cached = self.files.get(fpath)
+                    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                        continue
+                    try:
+                        resources = _load_manifest(fpath)
+                    except Exception:
+                        resources = []
+                    self.files[fpath] = (stat.st_mtime, stat.st_size, resources)
+                    changed = True
+            for fpath in set(self.files) - seen:
+                del self.files[fpath]
+                changed = True
+            if changed:
+                self._rebuild_indexes()
+                self._save()
+            self._last_refresh = time.monotonic()
+
+    def query(self, kind: Optional[str] = None, namespace: Optional[str] = None,
+              name: Optional[str] = None, label_selector: Optional[str] = None) -> List[Dict]:
+        self.refresh()
+        with self._lock:
+            candidates: Optional[Set[int]] = None
+
+            def narrow(ids: Set[int]) -> None:
+                nonlocal candidates
+                candidates = set(ids) if candidates is None else candidates & ids
+
+            if kind:
+                narrow(self.by_kind.get(kind.lower(), set()))
+            if namespace:
+                narrow(self.by_namespace.get(namespace, set()))
+            if name:
+                narrow(self.by_name.get(name, set()))
+            negative = []
+            for key, op, value in parse_label_selector(label_selector or ""):
+                if op == "=":
+                    narrow(self.by_label.get((key, value), set()))
+                else:
+                    negative.append((key, op, value))
+
+            ids = sorted(candidates) if candidates is not None else range(len(self.resources))
+            results = []
+            for i in ids:
+                r = self.resources[i]
+                labels = r["labels"]
+                if all((key in labels) if op == "exists" else str(labels.get(key)) != value
+                       for key, op, value in negative):
+                    results.append(r)
+            return results
+
+
+def _normalize_kind(kind: str) -> str:
+    """
+    "deploy", "Deployments", "deployments.apps" -> "deployment",
+    "networkpolicies" -> "networkpolicy"
+    """
+    kind = kind.lower().split(".", 1)[0]
+    kind = KIND_ALIASES.get(kind, kind)
+    if kind.endswith("ies"):
+        return kind[:-3] + "y"
+    if kind.endswith("sses"):
+        return kind[:-2]
+    if kind.endswith("s") and not kind.endswith("ss") and kind != "endpoints":
+        return kind[:-1]
+    return kind
+
+
+def _parse_resource(resource: str) -> Tuple[str, Optional[str]]:
+    """
+    "deploy/web", "deployment web" or "pods" -> (kind, name or None)
+    """
+    resource = resource.strip()
+    if "/" in resource:
+        kind, name = resource.split("/", 1)
+    else:
+        parts = resource.split()
+        kind, name = parts[0], (parts[1] if len(parts) > 1 else None)
+    return _normalize_kind(kind), name
+
+
+def _redact_secret(item: Dict) -> bool:
+    """
+    Blanks the values of a Secret in place, keeping its key names, and drops
+    the last-applied annotation that would repeat them. Returns True if
+    anything was removed.
+    """
+    if str(item.get("kind")) != "Secret":
+        return False
+    redacted = False
+    for field in ("data", "stringData"):
+        values = item.get(field)
+        if isinstance(values, dict) and any(v != REDACTED for v in values.values()):
+            item[field] = {key: REDACTED for key in values}
+            redacted = True
+    annotations = (item.get("metadata") or {}).get("annotations")
+    if isinstance(annotations, dict) and annotations.pop(LAST_APPLIED_ANNOTATION, None) is not None:
+        redacted = True
+    return redacted
+
+
+def _format_age(seconds: float) -> str:
+    if seconds < 120:
+        return f"{int(seconds)}s"
+    if seconds < 7200:
+        return f"{int(seconds // 60)}m"
+    if seconds < 172800:
+        return f"{int(seconds // 3600)}h"
+    return f"{int(seconds // 86400)}d"
+
+
+# ─────────────────────────────────────────────────────────────
+# Cluster Snapshot: offline copy of live cluster resources
+# ─────────────────────────────────────────────────────────────
+class ClusterSnapshot:
+    """
+    Local copy of cluster resources that `get` and `describe` can answer from
+    without reaching the cluster.
+
+    A snapshot is taken with one `kubectl get <type> --all-namespaces -o json`
+    per resource type, or imported from an existing dump (a kubectl List in
+    JSON or YAML, or a directory of them). It is stored as a single JSON file
+    together with the time it was taken. Secret values never reach that file,
+    only their key names. With a `ttl`, a stale kubectl snapshot is
+    re-exported on the next lookup; if the cluster cannot be reached the old
+    snapshot keeps being served. An imported dump is never replaced by an
+    export on its own, since the point of a dump is that there is no cluster.
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH, ttl: Optional[float] = None,
+                 resource_types: Optional[List[str]] = None):
+        self.path = path
+        self.ttl = ttl
+        self.resource_types = resource_types or SNAPSHOT_RESOURCE_TYPES
+        self.taken_at: Optional[float] = None
+        self.source: Optional[str] = None
+        self.items: List[Dict] = []
+        self.by_kind: Dict[str, List[int]] = defaultdict(list)
+        self._last_attempt: Optional[float] = None
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            redacted = self._set(data["items"], data.get("taken_at"), data.get("source"))
+        except Exception:
+            self._set([], None, None)
+            return
+        if redacted:
+            self._save()  # written before values were stripped
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"taken_at": self.taken_at, "source": self.source, "items": self.items}, f)
+        os.replace(tmp_path, self.path)
+
+    def _set(self, items: List[Dict], taken_at: Optional[float], source: Optional[str]) -> int:
+        # Returns how many Secrets had values stripped
+        self.items = [i for i in items if isinstance(i, dict) and i.get("kind")]
+        redacted = sum(_redact_secret(i) for i in self.items)
+        self.taken_at = taken_at
+        self.source = source
+        self.by_kind.clear()
+        for i, item in enumerate(self.items):
+            self.by_kind[str(item["kind"]).lower()].append(i)
+        return redacted
+
+    def from_dump(self) -> bool:
+        return self.source is not None and self.source != "kubectl"
+
+    def age(self) -> Optional[float]:
+        return None if self.taken_at is None else time.time() - self.taken_at
+
+    def is_stale(self) -> bool:
+        if self.taken_at is None:
+            return True
+        return self.ttl is not None and self.age() > self.ttl
+
+    def refresh(self, force: bool = False) -> str:
+        """
+        Re-exports the cluster if the snapshot is missing or older than the
+        TTL. Snapshots imported from a dump are only re-exported with `force`.
+        An export stops at the first resource type that fails, and failed
+        exports are retried at most once per TTL (or minute).
+        """
+        with self._lock:
+            if not force and self.from_dump():
+                return "✅ Serving the imported dump"
+            if not force and not self.is_stale():
+                return "✅ Snapshot is fresh"
+            retry_after = self.ttl or 60.0
+            if (not force and self._last_attempt is not None
+                    and time.monotonic() - self._last_attempt < retry_after):
+                return "⚠️ Cluster export failed recently; serving the existing snapshot"
+            self._last_attempt = time.monotonic()
+
+            items = []
+            for resource_type in self.resource_types:
+                try:
+                    output = subprocess.check_output(
+                        ["kubectl", "get", resource_type, "--all-namespaces", "-o", "json"],
+                        text=True, stderr=subprocess.DEVNULL, timeout=60,
+                    )
+                    items.extend(json.loads(output).get("items", []))
+                except (OSError, subprocess.SubprocessError, ValueError):
+                    # An unreachable cluster fails every type the same way; don't wait on each of them
+                    return (f"⚠️ Could not export {resource_type} from the cluster; "
+                            "serving the existing snapshot")
+            self._set(items, time.time(), "kubectl")
+            self._save()
+            return f"✅ Snapshot of {len(self.items)} resources from {len(self.resource_types)} resource types"
+
+    def import_dump(self, path: str) -> str:
+        """
+        Replaces the snapshot with the resources in a dump file or directory,
+        e.g. the output of `kubectl get all -A -o yaml > dump.yaml`. The dump's
+        modification time is used as the snapshot time.
+        """
+        files = []
+        if os.path.isdir(path):
+            for dirpath, _, fnames in os.walk(path):
+                files += [os.path.join(dirpath, f) for f in sorted(fnames)
+                          if f.endswith((".json", ".yaml", ".yml"))]
+        else:
+            files = [path]
+
+        items = []
+        for fpath in files:
+            with open(fpath, encoding="utf-8") as f:
+                if fpath.endswith(".json"):
+                    docs = [json.load(f)]
+                else:
+                    docs = list(yaml.load_all(f, Loader=YAML_LOADER))
+            for doc in docs:
+                if not isinstance(doc, dict):
+                    continue
+                if str(doc.get("kind") or "").endswith("List") and isinstance(doc.get("items"), list):
+                    items.extend(doc["items"])
+                else:
+                    items.append(doc)
+
+        with self._lock:
+            taken_at = max(os.path.getmtime(f) for f in files) if files else time.time()
+            self._set(items, taken_at, os.path.abspath(path))
+            self._save()
+        return f"✅ Imported {len(self.items)} resources from `{path}`"
+
+    def find(self, kind: str, name: Optional[str] = None, namespace: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            results = []
+            for i in self.by_kind.get(kind, []):
+                item = self.items[i]
+                metadata = item.get("metadata") or {}
+                if name and metadata.get("name") != name:
+                    continue
+                if namespace and metadata.get("namespace") not in (namespace, None):
+                    continue
+                results.append(item)
+            return results
+
+    def header(self) -> str:
+        if self.taken_at is None:
+            return "# snapshot: none"
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.taken_at))
+        stale = " (stale)" if self.is_stale() else ""
+        return f"# snapshot: {stamp}, {_format_age(self.age())} old{stale}, source={self.source}"
+
+
+def _describe_item(item: Dict) -> str:
+    metadata = item.get("metadata") or {}
+    lines = [
+        f"Name:         {metadata.get('name')}",
+        f"Namespace:    {metadata.get('namespace', '<none>')}",
+        f"Kind:         {item.get('kind')}",
+        f"Created:      {metadata.get('creationTimestamp', '<unknown>')}",
+    ]
+    for title, values in (("Labels", metadata.get("labels")), ("Annotations", metadata.get("annotations"))):
+        if isinstance(values, dict) and values:
+            lines.append(f"{title}:")
+            lines += [f"  {k}={v}" for k, v in sorted(values.items())]
+        else:
+            lines.append(f"{title}:{' ' * (13 - len(title))}<none>")
+    owners = metadata.get("ownerReferences") or []
+    if owners:
+        lines.append("Controlled By: " + ", ".join(f"{o.get('kind')}/{o.get('name')}" for o in owners))
+
+    status = dict(item["status"]) if isinstance(item.get("status"), dict) else {}
+    conditions = status.pop("conditions", None)
+    if status:
+        lines.append("Status:")
+        lines += ["  " + line for line in yaml.safe_dump(status, sort_keys=False).splitlines()]
+    if conditions:
+        lines.append("Conditions:")
+        lines += [f"  {c.get('type')}={c.get('status')} {c.get('reason') or ''}".rstrip()
+                  for c in conditions if isinstance(c, dict)]
+    if isinstance(item.get("spec"), dict):
+        lines.append("Spec:")
+        lines += ["  " + line for line in yaml.safe_dump(item["spec"], sort_keys=False).splitlines()]
+    if isinstance(item.get("data"), dict):
+        lines.append("Data keys:    " + ", ".join(sorted(item["data"])))
+    return "\n".join(lines)
+
 
 # ─────────────────────────────────────────────────────────────
 # Kubernetes YAML Tool
 # ─────────────────────────────────────────────────────────────
 class K8sYAMLTool:
-    def __init__(self, root_dir: str):
+    def __init__(self, root_dir: str, snapshot: bool = False, snapshot_ttl: Optional[float] = None,
+                 snapshot_path: str = DEFAULT_SNAPSHOT_PATH, snapshot_dump: Optional[str] = None):
+        """
+        With `snapshot=True`, `describe` and `get` read from a local
+        ClusterSnapshot instead of calling kubectl each time. `snapshot_dump`
+        seeds the snapshot from a dump file when no snapshot exists yet.
+        """
         self.root = Path(root_dir)
+        self.inventory = ManifestInventory(str(self.root))
+        self.snapshot = ClusterSnapshot(snapshot_path, ttl=snapshot_ttl) if snapshot else None
+        if self.snapshot is not None and snapshot_dump and self.snapshot.taken_at is None:
+            self.snapshot.import_dump(snapshot_dump)
 
-    def find_metadata(self) -> List[str]:
-        findings = []
-        for dirpath, _, files in os.walk(self.root):
-            for fname in files:
-                if not fname.endswith(('.yaml', '.yml')):
-                    continue
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    with open(fpath, encoding='utf-8') as f:
-                        docs = list(yaml.safe_load_all(f))
-                    for doc in docs:
-                        if not isinstance(doc, dict):
-                            continue
-                        ns = doc.get('metadata', {}).get('namespace')
-                        labels = doc.get('metadata', {}).get('labels')
-                        kind = doc.get('kind')
-                        name = doc.get('metadata', {}).get('name')
-                        if ns or labels:
-                            findings.append(f"{kind} `{name}` (ns={ns}, labels={labels}) in {fpath}")
-                except Exception:
-                    continue
+    def find_metadata(self, kind: Optional[str] = None, namespace: Optional[str] = None,
+                      label_selector: Optional[str] = None, name: Optional[str] = None,
+                      limit: int = 100) -> List[str]:
+        """
+        Resources from the YAML manifests, optionally filtered by kind,
+        namespace, name and a label selector such as "app=web,tier!=db".
+        Without filters, only resources that set a namespace or labels are
+        listed, as before.
+        """
+        resources = self.inventory.query(kind, namespace, name, label_selector)
+        if not (kind or namespace or name or label_selector):
+            resources = [r for r in resources if r["namespace"] or r["labels"]]
+        findings = [
+            f"{r['kind']} `{r['name']}` (ns={r['namespace']}, labels={r['labels'] or None}) in {r['path']}"
+            for r in resources[:limit]
+        ]
+        if len(resources) > limit:
+            findings.append(f"… {len(resources) - limit} more resources; narrow the filters to see them")
         return findings
 
+    def _snapshot_lookup(self, resource: str, namespace: Optional[str]) -> Tuple[List[Dict], str]:
+        self.snapshot.refresh()
+        kind, name = _parse_resource(resource)
+        return self.snapshot.find(kind, name, namespace), self.snapshot.header()
+
     def describe(self, resource: str, namespace: Optional[str] = None) -> str:
+        if self.snapshot is not None:
+            items, header = self._snapshot_lookup(resource, namespace)
+            if not items:
+                return f"❌ Failed to describe `{resource}`: not in snapshot\n{header}"
+            return header + "\n\n" + "\n\n\n".join(_describe_item(i) for i in items)
         cmd = ["kubectl", "describe", resource]
         if namespace:
             cmd += ["--namespace", namespace]
@@ -45,6 +502,12 @@ class K8sYAMLTool:
             return f"❌ Failed to describe `{resource}`"
 
     def get(self, resource: str, namespace: Optional[str] = None) -> str:
+        if self.snapshot is not None:
+            items, header = self._snapshot_lookup(resource, namespace)
+            if not items:
+                return f"❌ Failed to get `{resource}`: not in snapshot\n{header}"
+            doc = items[0] if len(items) == 1 else {"apiVersion": "v1", "kind": "List", "items": items}
+            return header + "\n" + yaml.safe_dump(doc, sort_keys=False).strip()
         cmd = ["kubectl", "get", resource, "-o", "yaml"]
         if namespace:
             cmd += ["--namespace", namespace]
@@ -52,4 +515,4 @@ class K8sYAMLTool:
             output = subprocess.check_output(cmd, text=True)
             return output.strip()
         except subprocess.CalledProcessError:
-            return f"❌ Failed to get `{resource}`"
\ No newline at end of file
+            return f"❌ Failed to get `{resource}`"
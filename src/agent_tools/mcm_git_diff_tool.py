@@ -1,53 +1,459 @@
 import difflib
+import hashlib
+import json
+import os
 import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from html import escape as html_escape
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from .ast.tree_sitter_support import get_parser
+from .ast.ts_ast_tool import outline_methods
+from .disk_cache import DiskLRUCache
+from .git_objects import get_object_reader
+
+FROM_PLACEHOLDER = "\x00FROM\x00"
+TO_PLACEHOLDER = "\x00TO\x00"
+
+REPORT_STYLE = """<style>
+table.mcm-hunks { font-family: monospace; font-size: 12px; border-collapse: collapse; }
+table.mcm-hunks td { padding: 0 6px; white-space: pre; }
+tr.mcm-add { background: #e6ffed; } tr.mcm-del { background: #ffeef0; } tr.mcm-hunk { color: #6a737d; }
+</style>"""
+
+
+def _unified_lines(before: List[str], after: List[str]) -> List[str]:
+    diff = difflib.unified_diff(before, after, fromfile=FROM_PLACEHOLDER, tofile=TO_PLACEHOLDER, n=3, lineterm="")
+    return list(diff)[2:]  # drop the ---/+++ file headers
+
+
+def _render_unified(lines: List[str], max_lines: int) -> str:
+    rows = []
+    for line in lines[:max_lines]:
+        css = {"+": "mcm-add", "-": "mcm-del", "@": "mcm-hunk"}.get(line[:1], "")
+        rows.append(f'<tr class="{css}"><td>{html_escape(line)}</td></tr>')
+    if len(lines) > max_lines:
+        rows.append(f'<tr class="mcm-hunk"><td>… {len(lines) - max_lines} more diff lines truncated</td></tr>')
+    return '<table class="mcm-hunks">' + "".join(rows) + "</table>"
+
+
+class _TimedHtmlDiff(difflib.HtmlDiff):
+    # make_table diffs lazily while laying out rows; draining the diff first splits the two phases
+    diff_seconds = 0.0
+
+    def _collect_lines(self, diffs):
+        started = time.perf_counter()
+        diffs = list(diffs)
+        self.diff_seconds = time.perf_counter() - started
+        return super()._collect_lines(diffs)
+
+
+def _count_changed_lines(args: Tuple[str, str]) -> Tuple[int, int]:
+    # Module-level so it can run in a worker process
+    before, after = args
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, before.splitlines(), after.splitlines(), autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return added, removed
+
+
+def _diff_outlines(before: Dict[str, dict], after: Dict[str, dict]) -> List[str]:
+    """
+    Compact, line-oriented description of method-level changes between two
+    outlines from outline_methods().
+    """
+    def span(entry: dict) -> str:
+        return f"L{entry['start']}-{entry['end']}"
+
+    def conditional(entry: List, sign: str) -> str:
+        kind, text, line = entry
+        text = text if len(text) <= 120 else text[:117] + "..."
+        return f"    {sign} {kind} ({text}) @L{line}"
+
+    changes = []
+    for name in sorted(after.keys() - before.keys(), key=lambda n: after[n]["start"]):
+        changes.append(f"  + {name} [{span(after[name])}]")
+        changes.extend(conditional(c, "+") for c in after[name]["conditionals"])
+    for name in sorted(before.keys() - after.keys(), key=lambda n: before[n]["start"]):
+        changes.append(f"  - {name} [{span(before[name])}]")
+    for name in sorted(before.keys() & after.keys(), key=lambda n: after[n]["start"]):
+        old, new = before[name], after[name]
+        if old["body_hash"] == new["body_hash"]:
+            continue
+        changes.append(f"  ~ {name} [{span(old)} → {span(new)}]")
+        old_texts = Counter(text for _, text, _ in old["conditionals"])
+        new_texts = Counter(text for _, text, _ in new["conditionals"])
+        inserted, dropped = new_texts - old_texts, old_texts - new_texts
+        for entry in new["conditionals"]:
+            if inserted[entry[1]] > 0:
+                changes.append(conditional(entry, "+"))
+                inserted[entry[1]] -= 1
+        for entry in old["conditionals"]:
+            if dropped[entry[1]] > 0:
+                changes.append(conditional(entry, "-"))
+                dropped[entry[1]] -= 1
+    return changes
+
+
+def _render_table(args: Tuple[str, str, str, int]) -> Tuple[str, float, float]:
+    # Module-level so it can run in a worker process. Descriptions are left as
+    # placeholders so one cached table can serve every branch with the same blobs.
+    # Returns the table plus the diff and render seconds spent on it in the worker.
+    before, after, mode, max_lines = args
+    before_lines, after_lines = before.splitlines(), after.splitlines()
+    started = time.perf_counter()
+    if mode == "context":
+        lines = _unified_lines(before_lines, after_lines)
+        diffed = time.perf_counter()
+        return _render_unified(lines, max_lines), diffed - started, time.perf_counter() - diffed
+    differ = _TimedHtmlDiff()
+    table = differ.make_table(before_lines[:max_lines], after_lines[:max_lines],
+                              fromdesc=FROM_PLACEHOLDER, todesc=TO_PLACEHOLDER)
+    if max(len(before_lines), len(after_lines)) > max_lines:
+        table += f"<p><small>… only the first {max_lines} lines of each side are shown</small></p>"
+    return table, differ.diff_seconds, time.perf_counter() - started - differ.diff_seconds
 
 
 class MCMGitDiffTool:
-    def __init__(self, repo_path: str, reference_branch: str = "default-integration"):
+    EXCLUDED_PREFIXES = ("src/aggregator/channels/",)
+    INCLUDED_SUFFIXES = (".ts",)
+
+    def __init__(self, repo_path: str, reference_branch: str = "default-integration",
+                 workers: Optional[int] = None, cache_bytes: int = 512 * 1024 * 1024):
         self.repo = Path(repo_path)
         self.ref_branch = reference_branch
+        self.workers = workers or os.cpu_count() or 1
         assert (self.repo / ".git").exists(), f"Not a valid Git repo: {repo_path}"
+        self.reader = get_object_reader(str(self.repo))
+        self.cache = DiskLRUCache("mcm_drift_cache", max_bytes=cache_bytes)
+        self._trees: LRUCache = LRUCache(maxsize=64)
+        self.last_timings: Dict[str, float] = {}
+
+    # The cache is shared with other processes (CLI and UI); a busy or broken
+    # database is treated as a miss rather than failing the report
+    def _cache_get(self, key: str):
+        try:
+            return self.cache.get(key)
+        except Exception:
+            return None
+
+    def _cache_put(self, key: str, value) -> None:
+        try:
+            self.cache.put(key, value)
+        except Exception:
+            pass
+
+    def _cache_flush(self) -> None:
+        try:
+            self.cache.flush()
+        except Exception:
+            pass
 
-    def _checkout_branch(self, branch: str):
-        subprocess.run(["git", "-C", str(self.repo), "fetch"], check=True)
-        subprocess.run(["git", "-C", str(self.repo), "checkout", branch], check=True)
+    def _rules_key(self) -> str:
+        rules = json.dumps([self.EXCLUDED_PREFIXES, self.INCLUDED_SUFFIXES])
+        return hashlib.sha1(rules.encode("utf-8")).hexdigest()[:12]
 
-    def _get_changed_files(self, branch: str) -> List[str]:
-        cmd = [
-            "git", "-C", str(self.repo), "diff", "--name-only",
-            f"origin/{self.ref_branch}...origin/{branch}"
-        ]
+    def _is_drift_path(self, path: str) -> bool:
+        return not path.startswith(self.EXCLUDED_PREFIXES) and path.endswith(self.INCLUDED_SUFFIXES)
+
+    def _resolve(self, branch: str) -> Optional[str]:
+        return self.reader.resolve(f"origin/{branch}") or self.reader.resolve(branch)
+
+    def _get_changed_files(self, ref_commit: str, target_commit: str) -> List[str]:
+        """
+        Drift paths changed on the target since its merge base with the
+        reference, cached per commit pair and exclusion rules.
+        """
+        key = f"files:{ref_commit}:{target_commit}:{self._rules_key()}"
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        cmd = ["git", "-C", str(self.repo), "diff", "--name-only", f"{ref_commit}...{target_commit}"]
         output = subprocess.check_output(cmd, text=True).splitlines()
-        return [f for f in output if not f.startswith("src/aggregator/channels/") and f.endswith(".ts")]
+        files = [f for f in output if self._is_drift_path(f)]
+        self._cache_put(key, files)
+        return files
+
+    def _tree_blobs(self, commit: str) -> Dict[str, str]:
+        # path -> blob SHA for a whole commit; commits are immutable, so memoize
+        if commit not in self._trees:
+            self._trees[commit] = {path: sha for _, obj_type, sha, path in self.reader.ls_tree(commit)
+                                   if obj_type == "blob"}
+        return self._trees[commit]
+
+    def _read_blobs(self, shas: List[str]) -> Dict[str, str]:
+        """
+        Reads many blobs in one pipelined cat-file batch.
+        """
+        unique = sorted(set(shas))
+        return {
+            sha: result[2].decode("utf-8", errors="replace") if result is not None else ""
+            for sha, result in zip(unique, self.reader.read_many(unique))
+        }
+
+    def iter_report(self, target_branch: str, limit: int = 20, mode: str = "full",
+                    max_lines_per_file: int = 2000, max_bytes: int = 5_000_000) -> Iterator[str]:
+        """
+        Yields the drift report as HTML sections: a header, one section per
+        changed file as soon as its diff is ready, and a footer.
+
+        mode="full" renders side-by-side tables of whole files; mode="context"
+        renders only the changed hunks with 3 lines of context. Each file is
+        capped at `max_lines_per_file` lines, and file sections stop once the
+        report would exceed `max_bytes`.
+
+        Whole reports are cached by the resolved commit pair, and individual
+        file diffs by their (reference blob, target blob) SHA pair, so domain
+        branches sharing an unchanged file reuse the same diff. The diff and
+        render timings are measured per file inside the workers and summed,
+        so they exclude time the caller spends consuming sections.
+        """
+        timings: Dict[str, float] = {}
+        header = f"<html><body>{REPORT_STYLE}<h2>⚠️ MCM Drift Report</h2>"
+        yield header
+        emitted = len(header)
 
-    def _get_file_from_branch(self, branch: str, filepath: str) -> str:
-        cmd = ["git", "-C", str(self.repo), "show", f"origin/{branch}:{filepath}"]
+        ref_commit = self._resolve(self.ref_branch)
+        target_commit = self._resolve(target_branch)
+        if ref_commit is None or target_commit is None:
+            missing = self.ref_branch if ref_commit is None else target_branch
+            yield f"<p>❌ Unknown branch `{missing}`</p></body></html>"
+            return
+
+        report_key = (f"report:{ref_commit}:{target_commit}:{self._rules_key()}:"
+                      f"{limit}:{mode}:{max_lines_per_file}:{max_bytes}")
+        cached_sections = self._cache_get(report_key)
+        if cached_sections is not None:
+            self._cache_flush()
+            yield from cached_sections
+            yield "<p><small>⏱️ served from cache</small></p></body></html>"
+            return
+
+        started = time.perf_counter()
+        changed_files = self._get_changed_files(ref_commit, target_commit)[:limit]
+        ref_tree, target_tree = self._tree_blobs(ref_commit), self._tree_blobs(target_commit)
+        files = [(f, ref_tree.get(f), target_tree.get(f)) for f in changed_files]
+        files = [(f, before, after) for f, before, after in files if before or after]
+        timings["list_files"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        tables: Dict[str, str] = {}
+        misses = []
+        for f, before_sha, after_sha in files:
+            key = f"file:{before_sha}:{after_sha}:{mode}:{max_lines_per_file}"
+            table = self._cache_get(key)
+            if table is None:
+                misses.append((f, before_sha, after_sha, key))
+            else:
+                tables[f] = table
+        contents = self._read_blobs([sha for _, before, after, _ in misses for sha in (before, after) if sha])
+        timings["read_blobs"] = time.perf_counter() - started
+
+        timings["diff"] = timings["render"] = 0.0
+        jobs = [(contents.get(before, ""), contents.get(after, ""), mode, max_lines_per_file)
+                for _, before, after, _ in misses]
+        pool = None
+        if self.workers > 1 and len(jobs) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)))
+            rendered = pool.map(_render_table, jobs)
+        else:
+            rendered = map(_render_table, jobs)
+        miss_keys = {f: key for f, _, _, key in misses}
+
+        sections = []
         try:
-            return subprocess.check_output(cmd, text=True)
-        except subprocess.CalledProcessError:
-            return ""
+            for i, (f, _, _) in enumerate(files):
+                if f not in tables:
+                    # Misses arrive from the pool in the same order they were submitted
+                    tables[f], diff_seconds, render_seconds = next(rendered)
+                    timings["diff"] += diff_seconds
+                    timings["render"] += render_seconds
+                    self._cache_put(miss_keys[f], tables[f])
+                table = (tables[f].replace(FROM_PLACEHOLDER, html_escape(f"{self.ref_branch}:{f}"))
+                         .replace(TO_PLACEHOLDER, html_escape(f"{target_branch}:{f}")))
+                section = f"<h3>{f}</h3>\n{table}<hr>"
+                if emitted + len(section) > max_bytes:
+                    section = (f"<p>✂️ Report truncated at {max_bytes // 1024} KB: "
+                               f"{len(files) - i} more changed files not shown.</p>")
+                    sections.append(section)
+                    yield section
+                    break
+                emitted += len(section)
+                sections.append(section)
+                yield section
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            self._cache_flush()  # also when the consumer stops reading early
+        self._cache_put(report_key, sections)
+        self._cache_flush()
 
-    def diff_to_html(self, target_branch: str, limit: int = 20) -> str:
-        changed_files = self._get_changed_files(target_branch)
-        html = ["<html><body><h2>⚠️ MCM Drift Report</h2>"]
+        self.last_timings = timings
+        yield ("<p><small>⏱️ " + ", ".join(f"{phase}: {seconds * 1000:.0f} ms"
+                                          for phase, seconds in timings.items())
+               + f" ({len(files) - len(misses)}/{len(files)} file diffs cached)</small></p>"
+               "</body></html>")
 
-        for file in changed_files[:limit]:
-            before = self._get_file_from_branch(self.ref_branch, file).splitlines()
-            after = self._get_file_from_branch(target_branch, file).splitlines()
+    def _list_branches(self, pattern: str) -> List[Tuple[str, str]]:
+        """
+        (branch, commit) for remote branches matching `pattern`, e.g. "domains/*".
+        """
+        cmd = ["git", "-C", str(self.repo), "for-each-ref", "--format=%(objectname) %(refname)",
+               f"refs/remotes/origin/{pattern}"]
+        branches = []
+        for line in subprocess.check_output(cmd, text=True).splitlines():
+            commit, refname = line.split(" ", 1)
+            branches.append((refname[len("refs/remotes/origin/"):], commit))
+        return sorted(branches)
 
-            if not before and not after:
-                continue
+    def scan_branches(self, pattern: str = "domains/*", chunk_size: int = 500) -> str:
+        """
+        Drift matrix of every branch matching `pattern` against the reference,
+        as compact JSON:
 
-            diff = difflib.HtmlDiff().make_table(before, after,
-                                                 fromdesc=f"{self.ref_branch}:{file}",
-                                                 todesc=f"{target_branch}:{file}")
-            html.append(f"<h3>{file}</h3>\n{diff}<hr>")
+            {"reference": ..., "reference_commit": ...,
+             "branches": [{"name", "commit", "files", "lines"}],
+             "files": [path, ...],
+             "cells": [[branch_index, file_index, added, removed], ...]}
 
-        html.append("</body></html>")
-        return "\n".join(html)
+        Only paths outside the excluded channel directories are counted. Each
+        distinct (reference blob, branch blob) pair is diffed once no matter
+        how many branches share it, and counts are cached by that pair.
+        """
+        started = time.perf_counter()
+        ref_commit = self._resolve(self.ref_branch)
+        if ref_commit is None:
+            return json.dumps({"error": f"Unknown reference branch {self.ref_branch}"})
+        branches = self._list_branches(pattern)
+        ref_tree = self._tree_blobs(ref_commit)
+
+        # 1. Changed paths per branch; listing is subprocess-bound, so threads are enough
+        with ThreadPoolExecutor(max_workers=min(8, max(len(branches), 1))) as pool:
+            changed = list(pool.map(lambda b: self._get_changed_files(ref_commit, b[1]), branches))
+
+        branch_files: List[List[Tuple[str, Tuple[Optional[str], Optional[str]]]]] = []
+        for (_, commit), files in zip(branches, changed):
+            tree = self._tree_blobs(commit)
+            branch_files.append([(f, (ref_tree.get(f), tree.get(f))) for f in files])
+
+        # 2. Count lines once per distinct blob pair, reading each blob once
+        counts: Dict[Tuple[Optional[str], Optional[str]], Tuple[int, int]] = {}
+        pending = []
+        for pair in sorted({pair for files in branch_files for _, pair in files if pair[0] != pair[1]},
+                           key=str):
+            cached = self._cache_get(f"lines:{pair[0]}:{pair[1]}")
+            if cached is None:
+                pending.append(pair)
+            else:
+                counts[pair] = cached
+
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 and len(pending) > 1 else None
+        try:
+            for i in range(0, len(pending), chunk_size):
+                chunk = pending[i:i + chunk_size]
+                contents = self._read_blobs([sha for pair in chunk for sha in pair if sha])
+                jobs = [(contents.get(before, ""), contents.get(after, "")) for before, after in chunk]
+                results = pool.map(_count_changed_lines, jobs) if pool else map(_count_changed_lines, jobs)
+                for pair, result in zip(chunk, results):
+                    counts[pair] = result
+                    self._cache_put(f"lines:{pair[0]}:{pair[1]}", result)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self._cache_flush()
+
+        # 3. Assemble the sparse matrix
+        all_files = sorted({f for files in branch_files for f, _ in files})
+        file_index = {f: i for i, f in enumerate(all_files)}
+        cells = []
+        branch_rows = []
+        for b, ((name, commit), files) in enumerate(zip(branches, branch_files)):
+            total = 0
+            drifted = 0
+            for f, pair in files:
+                added, removed = counts.get(pair, (0, 0))
+                if added or removed:
+                    cells.append([b, file_index[f], added, removed])
+                    total += added + removed
+                    drifted += 1
+            branch_rows.append({"name": name, "commit": commit, "files": drifted, "lines": total})
+
+        return json.dumps({
+            "reference": self.ref_branch,
+            "reference_commit": ref_commit,
+            "branches": branch_rows,
+            "files": all_files,
+            "cells": cells,
+            "distinct_diffs": len(counts),
+            "seconds": round(time.perf_counter() - started, 3),
+        }, separators=(",", ":"))
+
+    def _ts_outlines(self, shas: List[Optional[str]]) -> Dict[str, Dict[str, dict]]:
+        """
+        Method outlines per blob SHA. Outlines are cached per blob, so a file
+        version is parsed once no matter how many reports or branches see it.
+        """
+        outlines: Dict[str, Dict[str, dict]] = {}
+        missing = []
+        for sha in {sha for sha in shas if sha}:
+            cached = self._cache_get(f"ts_outline:v1:{sha}")
+            if cached is None:
+                missing.append(sha)
+            else:
+                outlines[sha] = cached
+        for sha, content in self._read_blobs(missing).items():
+            try:
+                outlines[sha] = outline_methods(content.encode("utf-8"))
+            except Exception:
+                outlines[sha] = {}
+            self._cache_put(f"ts_outline:v1:{sha}", outlines[sha])
+        self._cache_flush()
+        return outlines
+
+    def ts_structural_diff(self, target_branch: str, limit: int = 50) -> str:
+        """
+        Method-level drift of changed .ts files outside the channel directories:
+        added (+), removed (-) and modified (~) functions/methods with line
+        ranges, plus conditionals (if/switch/ternary) inserted into or removed
+        from each modified method. Meant to be read directly by the agent
+        instead of the HTML report.
+        """
+        if get_parser("typescript") is None:
+            return "❌ tree-sitter-typescript is not installed; structural diff unavailable."
+        ref_commit = self._resolve(self.ref_branch)
+        target_commit = self._resolve(target_branch)
+        if ref_commit is None or target_commit is None:
+            return f"❌ Unknown branch `{self.ref_branch if ref_commit is None else target_branch}`"
+
+        changed_files = self._get_changed_files(ref_commit, target_commit)[:limit]
+        ref_tree, target_tree = self._tree_blobs(ref_commit), self._tree_blobs(target_commit)
+        pairs = [(f, ref_tree.get(f), target_tree.get(f)) for f in changed_files]
+        outlines = self._ts_outlines([sha for _, before, after in pairs for sha in (before, after)])
+
+        report = [f"TS structural drift {self.ref_branch}..{target_branch} ({len(pairs)} files)"]
+        for f, before_sha, after_sha in pairs:
+            if before_sha is None:
+                report.append(f"{f} (new file)")
+            elif after_sha is None:
+                report.append(f"{f} (deleted)")
+                continue
+            else:
+                report.append(f)
+            changes = _diff_outlines(outlines.get(before_sha, {}), outlines.get(after_sha, {}))
+            report.extend(changes or ["  (no method-level changes)"])
+        return "\n".join(report)
 
+    def diff_to_html(self, target_branch: str, limit: int = 20, mode: str = "full",
+                     max_lines_per_file: int = 2000, max_bytes: int = 5_000_000) -> str:
+        return "\n".join(self.iter_report(target_branch, limit, mode, max_lines_per_file, max_bytes))
 
 if __name__ == "__main__":
     tool = MCMGitDiffTool("/path/to/mcm-repo")
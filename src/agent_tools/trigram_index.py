@@ -0,0 +1,200 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+DEFAULT_INDEX_DIR = ".cache"
+MAX_FILE_BYTES = 1 << 20
+READ_BATCH = 512
+# Bumped when stored postings can no longer be trusted; older databases are emptied on open
+SCHEMA_VERSION = 2
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """
+    Case-folded byte trigrams of `data`, packed into 24-bit ints.
+    """
+    data = data.lower()
+    return {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}
+
+
+def required_literals(pattern: str, regex: bool) -> List[str]:
+    """
+    Substrings that every match of `pattern` must contain. For regexes this is
+    the runs of plain literals in the top-level sequence; anything fancier
+    (alternation, classes, repeats) just ends the current run.
+    """
+    if not regex:
+        return [pattern]
+    literals, run = [], []
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return []
+    for op, arg in parsed:
+        if op == sre_parse.LITERAL:
+            run.append(chr(arg))
+        else:
+            if run:
+                literals.append("".join(run))
+            run = []
+    if run:
+        literals.append("".join(run))
+    return literals
+
+
+# ─────────────────────────────────────────────────────────────
+# Trigram Index: candidate-file lookup for grep, keyed by blob SHA
+# ─────────────────────────────────────────────────────────────
+class TrigramIndex:
+    """
+    Inverted trigram index for one Git repository.
+
+    Postings are stored per blob SHA, so a file that is identical on several
+    branches is only indexed once; each indexed branch just maps its paths to
+    blobs. A grep first intersects the posting lists of the pattern's trigrams
+    and only then scans lines of the surviving candidates. Text files over
+    MAX_FILE_BYTES get no postings; they are always candidates, so callers
+    scan them directly instead of silently missing them.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blobs (
+            id INTEGER PRIMARY KEY,
+            sha TEXT UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            trigram INTEGER NOT NULL,
+            blob_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, blob_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_postings_blob ON postings(blob_id);
+        CREATE TABLE IF NOT EXISTS paths (
+            branch TEXT NOT NULL,
+            path TEXT NOT NULL,
+            blob_id INTEGER NOT NULL,
+            PRIMARY KEY (branch, path)
+        );
+        CREATE TABLE IF NOT EXISTS unindexed (
+            blob_id INTEGER PRIMARY KEY
+        );
+        CREATE TABLE IF NOT EXISTS branches (
+            branch TEXT PRIMARY KEY,
+            stamp TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, repo_path: str, db_path: Optional[str] = None):
+        self.repo = os.path.abspath(repo_path)
+        name = os.path.basename(self.repo.rstrip(os.sep))
+        self.db_path = db_path or os.path.join(DEFAULT_INDEX_DIR, "trigram", f"{name}.sqlite")
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Version 0 could hold working-tree text under a staged blob's SHA; version 1 dropped large files
+            with self.conn:
+                for table in ("postings", "blobs", "unindexed", "paths", "branches"):
+                    self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def stamp(self, branch: str) -> Optional[str]:
+        row = self.conn.execute("SELECT stamp FROM branches WHERE branch = ?", (branch,)).fetchone()
+        return row[0] if row else None
+
+    def sync(self, branch: str, stamp: str, entries: Iterable[Tuple[str, str]],
+             read_blobs: Callable[[List[Tuple[str, str]]], List[Optional[bytes]]]) -> int:
+        """
+        Points `branch` at the given (path, blob_sha) entries, indexing any
+        blob not seen before. `read_blobs` receives batches of (path, sha) and
+        returns their contents in the same order, so callers can pipeline the
+        reads. The contents must be exactly the blob named by the SHA, since
+        postings are shared by every branch that has it. `stamp` identifies
+        the state that was indexed (e.g. a commit SHA or .git/index mtime) so
+        the caller can skip syncing when nothing changed. Returns blobs indexed.
+        """
+        indexed = 0
+        with self._lock, self.conn:
+            known = dict(self.conn.execute("SELECT sha, id FROM blobs"))
+            entries = list(entries)
+            missing, seen = [], set()
+            for path, sha in entries:
+                if sha not in known and sha not in seen:
+                    seen.add(sha)
+                    missing.append((path, sha))
+
+            for i in range(0, len(missing), READ_BATCH):
+                batch = missing[i:i + READ_BATCH]
+                for (_, sha), data in zip(batch, read_blobs(batch)):
+                    if data is None or b"\0" in data[:8192]:
+                        continue
+                    blob_id = self.conn.execute("INSERT INTO blobs (sha) VALUES (?)", (sha,)).lastrowid
+                    known[sha] = blob_id
+                    if len(data) > MAX_FILE_BYTES:
+                        self.conn.execute("INSERT INTO unindexed (blob_id) VALUES (?)", (blob_id,))
+                        continue
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO postings (trigram, blob_id) VALUES (?, ?)",
+                        ((t, blob_id) for t in trigrams(data)),
+                    )
+                    indexed += 1
+
+            rows = [(branch, path, known[sha]) for path, sha in entries if sha in known]
+            self.conn.execute("DELETE FROM paths WHERE branch = ?", (branch,))
+            self.conn.executemany("INSERT INTO paths (branch, path, blob_id) VALUES (?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO branches (branch, stamp) VALUES (?, ?)", (branch, stamp))
+
+            # Drop blobs no branch refers to any more
+            orphans = [r[0] for r in self.conn.execute(
+                "SELECT id FROM blobs WHERE id NOT IN (SELECT DISTINCT blob_id FROM paths)")]
+            for blob_id in orphans:
+                self.conn.execute("DELETE FROM postings WHERE blob_id = ?", (blob_id,))
+                self.conn.execute("DELETE FROM unindexed WHERE blob_id = ?", (blob_id,))
+                self.conn.execute("DELETE FROM blobs WHERE id = ?", (blob_id,))
+        return indexed
+
+    def candidates(self, branch: str, pattern: str, regex: bool = False,
+                   ext: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        (path, blob_sha) pairs on `branch` that can contain `pattern`, in path order.
+        Patterns with no literal of 3+ characters cannot be narrowed and
+        return every file; files too large to index are always returned.
+        """
+        grams: Set[int] = set()
+        for literal in required_literals(pattern, regex):
+            grams |= trigrams(literal.encode("utf-8"))
+
+        with self._lock:
+            blob_ids: Optional[Set[int]] = None
+            # Intersect rarest-first so the working set shrinks as fast as possible
+            counts = sorted(
+                (self.conn.execute("SELECT COUNT(*) FROM postings WHERE trigram = ?", (g,)).fetchone()[0], g)
+                for g in grams
+            )
+            for _, g in counts:
+                ids = {r[0] for r in self.conn.execute("SELECT blob_id FROM postings WHERE trigram = ?", (g,))}
+                blob_ids = ids if blob_ids is None else blob_ids & ids
+                if not blob_ids:
+                    break
+            if blob_ids is not None:
+                blob_ids |= {r[0] for r in self.conn.execute("SELECT blob_id FROM unindexed")}
+                if not blob_ids:
+                    return []
+
+            sql = ("SELECT p.path, b.sha, p.blob_id FROM paths p JOIN blobs b ON b.id = p.blob_id "
+                   "WHERE p.branch = ?")
+            params: list = [branch]
+            if ext:
+                sql += " AND p.path LIKE ?"
+                params.append(f"%{ext}")
+            sql += " ORDER BY p.path"
+            return [(path, sha) for path, sha, blob_id in self.conn.execute(sql, params)
+                    if blob_ids is None or blob_id in blob_ids]
@@ -0,0 +1,139 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFINITION_KINDS = ("class", "type", "function", "method")
+# Lines that belong to the definition below them (doc comments, annotations, decorators)
+LEADING_PREFIXES = ("//", "/*", "*", "@", "#")
+
+_extractors: Optional[Dict[str, Callable[[str], List[Tuple[str, str, str, int]]]]] = None
+
+
+def _get_extractors() -> Dict[str, Callable[[str], List[Tuple[str, str, str, int]]]]:
+    # Imported on first use so only worker processes that chunk code pay for javalang/tree-sitter
+    global _extractors
+    if _extractors is None:
+        from src.agent_tools.ast import go_ast_tool, java_ast_tool, php_ast_tool, py_ast_tool, ts_ast_tool
+        _extractors = {
+            "java": java_ast_tool.extract_symbols,
+            "go": go_ast_tool.extract_symbols,
+            "ts": ts_ast_tool.extract_symbols,
+            "php": php_ast_tool.extract_symbols,
+            "python": py_ast_tool.extract_symbols,
+        }
+    return _extractors
+
+
+def _definitions(path: str, language: str, line_count: int) -> List[Tuple[int, str, str]]:
+    """
+    Sorted (line, kind, qualified name) of every class/type/function/method,
+    one per line; classes win over members declared on the same line.
+    """
+    by_line: Dict[int, Tuple[str, str]] = {}
+    for kind, name, container, line in _get_extractors()[language](path):
+        if kind not in DEFINITION_KINDS or not 1 <= line <= line_count:
+            continue
+        current = by_line.get(line)
+        if current is None or DEFINITION_KINDS.index(kind) < DEFINITION_KINDS.index(current[0]):
+            by_line[line] = (kind, f"{container}.{name}" if container else name)
+    return [(line, kind, name) for line, (kind, name) in sorted(by_line.items())]
+
+
+def _split_oversized(lines: List[str], start: int, max_chars: int, header: str = "",
+                     header_line: int = 0) -> List[Tuple[int, int, str]]:
+    """
+    Line-aligned (start_line, end_line, text) pieces of at most `max_chars`.
+    Pieces starting after `header_line` repeat `header`, the symbol's
+    definition line, so they stay attributable to it; pieces of folded
+    fragments before it keep source order. A single line longer than the
+    limit is hard-cut.
+    """
+    pieces: List[Tuple[int, int, str]] = []
+    buf: List[str] = []
+    size = 0
+    piece_start = start
+
+    def flush(end: int) -> None:
+        if "".join(buf).strip() and "".join(buf) != header:
+            pieces.append((piece_start, end, "".join(buf)))
+
+    for offset, line in enumerate(lines):
+        lineno = start + offset
+        if len(line) > max_chars:
+            flush(lineno - 1)
+            pieces.extend((lineno, lineno, line[i:i + max_chars]) for i in range(0, len(line), max_chars))
+            buf, size, piece_start = [], 0, lineno + 1
+            continue
+        if buf and size + len(line) > max_chars:
+            flush(lineno - 1)
+            buf, size, piece_start = [], 0, lineno
+            if header and lineno > header_line and len(header) + len(line) <= max_chars:
+                buf, size = [header], len(header)
+        buf.append(line)
+        size += len(line)
+    flush(start + len(lines) - 1)
+    return pieces
+
+
+def symbol_chunks(path: str, language: str, max_chars: int = 1200,
+                  min_chars: int = 80) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Splits a source file at class/function/method boundaries found by the
+    AST extractors, returning (text, metadata) pairs with symbol, kind,
+    start_line and end_line. There is no overlap between chunks. Symbols
+    longer than `max_chars` are sub-split on line boundaries (metadata
+    `part`). Module-level fragments (package, imports) and bare container
+    headers ("class Foo {") shorter than `min_chars` are folded into the
+    symbol after them; real symbols are never folded, however short.
+    Returns None when the file has no recognizable definitions, so the
+    caller can fall back to the character splitter.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    if language not in _get_extractors() or not lines:
+        return None
+    definitions = _definitions(path, language, len(lines))
+    if not definitions:
+        return None
+
+    # Segment starts, moved up over doc comments / annotations / decorators
+    starts: List[Tuple[int, str, str]] = []
+    floor = 0
+    for line, kind, name in definitions:
+        start = line
+        while start - 1 > floor and lines[start - 2].strip().startswith(LEADING_PREFIXES):
+            start -= 1
+        starts.append((start, kind, name))
+        floor = line
+    segments: List[List[Any]] = []  # [start, end, kind, symbol, definition line]
+    if starts[0][0] > 1:
+        segments.append([1, starts[0][0] - 1, "module", "", 0])
+    for i, ((start, kind, name), (line, _, _)) in enumerate(zip(starts, definitions)):
+        end = starts[i + 1][0] - 1 if i + 1 < len(starts) else len(lines)
+        segments.append([start, end, kind, name, line])
+
+    def text_of(segment: List[Any]) -> str:
+        return "".join(lines[segment[0] - 1:segment[1]])
+
+    def is_header(segment: List[Any], following: List[Any]) -> bool:
+        # Imports and package lines, or a class header directly followed by its first member
+        return segment[2] == "module" or (segment[2] in ("class", "type")
+                                          and following[3].startswith(segment[3] + "."))
+
+    merged: List[List[Any]] = []
+    for segment in segments:
+        if merged and is_header(merged[-1], segment) and len(text_of(merged[-1]).strip()) < min_chars:
+            segment[0] = merged.pop()[0]
+        merged.append(segment)
+
+    chunks: List[Tuple[str, Dict[str, Any]]] = []
+    for start, end, kind, name, line in merged:
+        text = text_of([start, end])
+        if not text.strip():
+            continue
+        metadata = {"source": path, "symbol": name, "kind": kind, "chunker": "symbol"}
+        if len(text) <= max_chars:
+            chunks.append((text, {**metadata, "start_line": start, "end_line": end}))
+            continue
+        for part, (piece_start, piece_end, piece) in enumerate(
+                _split_oversized(lines[start - 1:end], start, max_chars, lines[line - 1] if line else "", line)):
+            chunks.append((piece, {**metadata, "start_line": piece_start, "end_line": piece_end, "part": part}))
+    return chunks
@@ -1,161 +1,385 @@
-from crewai import Agent
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.llms import Ollama
+import logging
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict
 
-from .agent_tools.ast import JavaASTTool, PyASTTool, GoASTTool, TypeScriptASTTool, PHPASTTool
-from .agent_tools import GitTool, K8sYAMLTool
-from .agent_tools import MCMGitDiffTool
-from .util import get_config
+_import_started = time.perf_counter()
 
-# Load vector store
-vectorstore = Chroma(persist_directory="vector_store", embedding_function=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
+from util import get_config, get_config_value
+
+# Nothing heavy happens at import time: the vector store, embedding model, LLM
+# clients, tools and agents are built on first use by the cached getters
+# below and shared for the life of the process. The old module-level names
+# (java_agent, vectorstore, git_tool, ...) still work through __getattr__.
+
+logger = logging.getLogger("crew_agents")
+config = get_config()
+BUILD_TIMINGS: Dict[str, float] = {}
+
+
+@contextmanager
+def _timed(name):
+    started = time.perf_counter()
+    yield
+    BUILD_TIMINGS[name] = time.perf_counter() - started
+    logger.info(f"🏗️ Built {name} in {BUILD_TIMINGS[name]:.2f}s")
+
+
+# ─────────────────────────────────────────────────────────────
+# Vector store and retrieval
+# ─────────────────────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def get_embedding():
+    with _timed("embedding"):
+        from langchain.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+
+@lru_cache(maxsize=None)
+def get_vectorstore():
+    with _timed("vectorstore"):
+        from langchain.vectorstores import Chroma
+        return Chroma(persist_directory="vector_store", embedding_function=get_embedding())
+
+@lru_cache(maxsize=None)
+def get_retriever():
+    with _timed("retriever"):
+        from index_manifest import read_generation
+        from lexical_index import LexicalIndex
+        from retrieval import VectorRetriever
+        return VectorRetriever(
+            get_vectorstore(), get_embedding(),
+            lexical=LexicalIndex("vector_store/lexical"),
+            generation=lambda: read_generation("vector_store/index_manifest.json"),
+            result_ttl=get_config_value("RETRIEVAL.RESULT_TTL", 600),
+            embedding_ttl=get_config_value("RETRIEVAL.EMBEDDING_TTL", 24 * 3600),
+        )
+
+retrieval_mode = get_config_value("RETRIEVAL.MODE", "hybrid")
 
 class CodebaseQueryTool:
-    def __init__(self, label, filter_keyword=None):
+    def __init__(self, label, language=None, k=5, mode=None):
         self.label = label
-        self.filter_keyword = filter_keyword
+        self.language = language
+        self.k = k
+        self.mode = mode or retrieval_mode
+
+    @staticmethod
+    def format_hits(label, hits):
+        return f"[{label} results]\n" + "\n---\n".join([text for text, _, _ in hits])
 
     def search(self, query):
-        results = vectorstore.similarity_search(query, k=5)
-        if self.filter_keyword:
-            results = [doc for doc in results if self.filter_keyword.lower() in doc.metadata.get("source", "").lower()]
-        return f"[{self.label} results]\n" + "\n---\n".join([doc.page_content for doc in results])
+        hits = get_retriever().search(query, language=self.language, k=self.k, mode=self.mode)
+        return self.format_hits(self.label, hits)
 
-config = get_config()
-# Tool instances
-java_tool = CodebaseQueryTool("Java", ".java")
-go_tool = CodebaseQueryTool("Go", ".go")
-php_tool = CodebaseQueryTool("PHP", ".php")
-ts_tool = CodebaseQueryTool("TS", ".ts")
-py_tool = CodebaseQueryTool("Python", ".py")
-docs_tool = CodebaseQueryTool("Docs")
-
-# LLMs
-java_llm = Ollama(model="deepseek-coder")
-go_llm = Ollama(model="codellama")
-php_llm = Ollama(model="code-llama")
-ts_llm = Ollama(model="code-llama")
-py_llm = Ollama(model="codellama")
-docs_llm = Ollama(model="mistral")
-architect_llm = Ollama(model="llama3")
-k8s_llm = Ollama(model="mistral")
-mcm_llm = Ollama(model="code-llama")
-
-# AST tools
-java_ast_tool = JavaASTTool("data/code")
-python_ast_tool = PyASTTool("data/code")
-go_ast_tool = GoASTTool("data/code")
-ts_ast_tool = TypeScriptASTTool("data/code")
-php_ast_tool = PHPASTTool("data/code")
-
-# External tools
-git_tool = GitTool("data/code")
-k8s_yaml_tool = K8sYAMLTool("data/code")
-mcm_diff_tool = MCMGitDiffTool("data/code/mcm")  # specify correct MCM repo path
+class MultiLanguageQueryTool:
+    """
+    Runs one query through several CodebaseQueryTools in a single batch:
+    one embedding and one collection query per language.
+    """
+    def __init__(self, tools):
+        self.tools = tools
+
+    def search(self, query):
+        results = get_retriever().search_many([(query, tool.language) for tool in self.tools],
+                                              k=max(tool.k for tool in self.tools), mode=retrieval_mode)
+        return "\n\n".join(CodebaseQueryTool.format_hits(tool.label, hits[:tool.k])
+                           for tool, hits in zip(self.tools, results))
+
+# Query tool name -> (label, language metadata value)
+QUERY_TOOLS = {
+    "java_tool": ("Java", "java"),
+    "go_tool": ("Go", "go"),
+    "php_tool": ("PHP", "php"),
+    "ts_tool": ("TS", "ts"),
+    "py_tool": ("Python", "python"),
+    "docs_tool": ("Docs", None),
+}
+
+@lru_cache(maxsize=None)
+def get_query_tool(name):
+    label, language = QUERY_TOOLS[name]
+    return CodebaseQueryTool(label, language)
+
+@lru_cache(maxsize=None)
+def get_all_code_tool():
+    return MultiLanguageQueryTool([get_query_tool(name) for name in QUERY_TOOLS])
+
+
+# ─────────────────────────────────────────────────────────────
+# LLM clients: one per model, shared by the agents that use it
+# ─────────────────────────────────────────────────────────────
+LLM_MODELS = {
+    "java_llm": "deepseek-coder",
+    "go_llm": "codellama",
+    "php_llm": "code-llama",
+    "ts_llm": "code-llama",
+    "py_llm": "codellama",
+    "docs_llm": "mistral",
+    "architect_llm": "llama3",
+    "k8s_llm": "mistral",
+    "mcm_llm": "code-llama",
+}
+
+@lru_cache(maxsize=None)
+def get_stream_handler():
+    """
+    Shared callback handler: every LLM and agent reports tokens and tool calls
+    to it, and it forwards them to the request opened with
+    `get_stream_handler().request(*sinks)` in the current context.
+    """
+    from streaming import StreamingCallbackHandler
+    return StreamingCallbackHandler()
+
+@lru_cache(maxsize=None)
+def get_llm(model):
+    with _timed(f"llm:{model}"):
+        from langchain_community.llms import Ollama
+        if get_config_value("STREAMING.ENABLED", True):
+            return Ollama(model=model, callbacks=[get_stream_handler()])
+        return Ollama(model=model)
+
+
+# ─────────────────────────────────────────────────────────────
+# AST and external tools
+# ─────────────────────────────────────────────────────────────
+scan_workers = get_config_value("AST.SCAN_WORKERS", 0) or None
+AST_TOOLS = {
+    "java_ast_tool": "JavaASTTool",
+    "python_ast_tool": "PyASTTool",
+    "go_ast_tool": "GoASTTool",
+    "ts_ast_tool": "TypeScriptASTTool",
+    "php_ast_tool": "PHPASTTool",
+}
+
+@lru_cache(maxsize=None)
+def get_ast_tool(name):
+    with _timed(name):
+        from agent_tools import ast as ast_tools
+        return getattr(ast_tools, AST_TOOLS[name])("data/code", workers=scan_workers)
 
+@lru_cache(maxsize=None)
+def get_git_tool():
+    from agent_tools import GitTool
+    return GitTool("data/code")
+
+@lru_cache(maxsize=None)
+def get_k8s_yaml_tool():
+    with _timed("k8s_yaml_tool"):
+        from agent_tools import K8sYAMLTool
+        return K8sYAMLTool(
+            "data/code",
+            snapshot=get_config_value("AGENTS.K8S.SNAPSHOT", False),
+            snapshot_ttl=get_config_value("AGENTS.K8S.SNAPSHOT_TTL", None),
+            snapshot_dump=get_config_value("AGENTS.K8S.SNAPSHOT_DUMP", "") or None,
+        )
+
+@lru_cache(maxsize=None)
+def get_mcm_diff_tool():
+    from agent_tools import MCMGitDiffTool
+    return MCMGitDiffTool("data/code/mcm")  # specify correct MCM repo path
+
+
+# ─────────────────────────────────────────────────────────────
 # Agents
-docs_agent = Agent(
-    role="Documentation Researcher",
-    goal="Search through wikis, Slack logs, and notes to find context.",
-    backstory="You specialize in synthesizing business knowledge from unstructured sources.",
-    tools=[docs_tool.search],
-    llm=docs_llm,
-    verbose=True
-)
-
-java_agent = Agent(
-    role="Java Microservice Analyst",
-    goal="Analyze Java services for architecture, dependencies, and data flow.",
-    backstory="You are an expert in Java and Spring Boot systems.",
-    tools=[java_tool.search, java_ast_tool.search],
-    llm=java_llm,
-    verbose=True
-)
-
-go_agent = Agent(
-    role="Go Backend Specialist",
-    goal="Understand Go services and their concurrency logic.",
-    backstory="You are proficient in idiomatic Go and microservices.",
-    tools=[go_tool.search, go_ast_tool.search],
-    llm=go_llm,
-    verbose=True
-)
-
-php_agent = Agent(
-    role="Legacy PHP Analyst",
-    goal="Understand legacy PHP systems, logic, and integrations.",
-    backstory="You analyze old PHP monoliths and service connectors.",
-    tools=[php_tool.search, php_ast_tool.search],
-    llm=php_llm,
-    verbose=True
-)
-
-ts_agent = Agent(
-    role="Frontend TS Analyst",
-    goal="Analyze TypeScript UI services and component flow.",
-    backstory="You specialize in TypeScript SPA logic and frontend structure.",
-    tools=[ts_tool.search, ts_ast_tool.search],
-    llm=ts_llm,
-    verbose=True
-)
-
-py_agent = Agent(
-    role="Python Utility Reviewer",
-    goal="Understand Python tools, scripts, and support services.",
-    backstory="You assist in identifying utility patterns and logic across scripts.",
-    tools=[py_tool.search, python_ast_tool.search],
-    llm=py_llm,
-    verbose=True
-)
-
-kubernetes_agent = Agent(
-    role="Kubernetes Config Inspector",
-    goal="Explore and answer questions about Kubernetes YAML configs, labels, namespaces, secrets, and config maps.",
-    backstory="You use YAML parsing and kubectl to analyze the cluster state and config files, but never modify anything.",
-    tools=[k8s_yaml_tool.find_metadata, k8s_yaml_tool.describe, k8s_yaml_tool.get],
-    llm=k8s_llm,
-    verbose=True
-)
-
-mcm_agent = Agent(
-    role="MCM Git Diff & Divergence Analyst",
-    goal="Help detect deviations from the MCM v3 default implementation by comparing domain branches and flagging unexpected changes outside allowed customization areas.",
-    backstory=(
-        "You are an expert in the MCM v3 architecture, which is a modular TypeScript/NestJS platform structured for domain isolation. "
-        "Each integration is expected to customize billing channel logic exclusively under `src/aggregator/channels/<network>/<billing_channel>`, "
-        "based on a default implementation rooted in `aggregator/hyve`. However, in practice, domain branches (e.g., domains/ng.mycontent.mobi) often contain changes outside these paths, "
-        "leading to fragile or undocumented behavior.\n\n"
-        "Your job is to:\n"
-        "- Compare a given domain branch to the reference (e.g., default-integration).\n"
-        "- Exclude changes inside the channels directory.\n"
-        "- Highlight all other diffs, per line.\n"
-        "- Additionally, perform AST-based inspection of changed TypeScript files, focusing on inserted logic inside method bodies (like conditionals or guards).\n\n"
-        "This allows developers to quickly identify where integration-specific logic has leaked into shared layers, breaking intended modularity."
-    ),
-    tools=[
-        ts_tool.search,
-        git_tool.checkout_branch,
-        git_tool.grep_file,
-        mcm_diff_tool.diff_to_html
-    ],
-    llm=mcm_llm,
-    verbose=True
-)
-
-architect_agent = Agent(
-    role="Lead Software Architect",
-    goal="Answer questions using knowledge from all code and context sources.",
-    backstory="You coordinate multiple specialists to generate accurate system-level insights.",
-    tools=[
-        java_tool.search, go_tool.search, php_tool.search,
-        ts_tool.search, py_tool.search, docs_tool.search,
-        java_ast_tool.search, python_ast_tool.search,
-        go_ast_tool.search, ts_ast_tool.search, php_ast_tool.search,
-        k8s_yaml_tool.find_metadata, k8s_yaml_tool.describe,
-        git_tool.checkout_branch, git_tool.grep_file,
-        mcm_diff_tool.diff_to_html
-    ],
-    llm=architect_llm,
-    verbose=True
-)
+# ─────────────────────────────────────────────────────────────
+def _make_agent(**kwargs):
+    from crewai import Agent
+    if get_config_value("STREAMING.ENABLED", True):
+        kwargs.setdefault("step_callback", get_stream_handler().on_agent_step)
+    return Agent(**kwargs)
+
+def _build_docs_agent():
+    return _make_agent(
+        role="Documentation Researcher",
+        goal="Search through wikis, Slack logs, and notes to find context.",
+        backstory="You specialize in synthesizing business knowledge from unstructured sources.",
+        tools=[get_query_tool("docs_tool").search],
+        llm=get_llm(LLM_MODELS["docs_llm"]),
+        verbose=True
+    )
+
+def _build_java_agent():
+    return _make_agent(
+        role="Java Microservice Analyst",
+        goal="Analyze Java services for architecture, dependencies, and data flow.",
+        backstory="You are an expert in Java and Spring Boot systems.",
+        tools=[get_query_tool("java_tool").search, get_ast_tool("java_ast_tool").search],
+        llm=get_llm(LLM_MODELS["java_llm"]),
+        verbose=True
+    )
+
+def _build_go_agent():
+    return _make_agent(
+        role="Go Backend Specialist",
+        goal="Understand Go services and their concurrency logic.",
+        backstory="You are proficient in idiomatic Go and microservices.",
+        tools=[get_query_tool("go_tool").search, get_ast_tool("go_ast_tool").search],
+        llm=get_llm(LLM_MODELS["go_llm"]),
+        verbose=True
+    )
+
+def _build_php_agent():
+    return _make_agent(
+        role="Legacy PHP Analyst",
+        goal="Understand legacy PHP systems, logic, and integrations.",
+        backstory="You analyze old PHP monoliths and service connectors.",
+        tools=[get_query_tool("php_tool").search, get_ast_tool("php_ast_tool").search],
+        llm=get_llm(LLM_MODELS["php_llm"]),
+        verbose=True
+    )
+
+def _build_ts_agent():
+    return _make_agent(
+        role="Frontend TS Analyst",
+        goal="Analyze TypeScript UI services and component flow.",
+        backstory="You specialize in TypeScript SPA logic and frontend structure.",
+        tools=[get_query_tool("ts_tool").search, get_ast_tool("ts_ast_tool").search],
+        llm=get_llm(LLM_MODELS["ts_llm"]),
+        verbose=True
+    )
+
+def _build_py_agent():
+    return _make_agent(
+        role="Python Utility Reviewer",
+        goal="Understand Python tools, scripts, and support services.",
+        backstory="You assist in identifying utility patterns and logic across scripts.",
+        tools=[get_query_tool("py_tool").search, get_ast_tool("python_ast_tool").search],
+        llm=get_llm(LLM_MODELS["py_llm"]),
+        verbose=True
+    )
+
+def _build_kubernetes_agent():
+    k8s_yaml_tool = get_k8s_yaml_tool()
+    return _make_agent(
+        role="Kubernetes Config Inspector",
+        goal="Explore and answer questions about Kubernetes YAML configs, labels, namespaces, secrets, and config maps.",
+        backstory="You use YAML parsing and kubectl to analyze the cluster state and config files, but never modify anything.",
+        tools=[k8s_yaml_tool.find_metadata, k8s_yaml_tool.describe, k8s_yaml_tool.get],
+        llm=get_llm(LLM_MODELS["k8s_llm"]),
+        verbose=True
+    )
+
+def _build_mcm_agent():
+    git_tool = get_git_tool()
+    mcm_diff_tool = get_mcm_diff_tool()
+    return _make_agent(
+        role="MCM Git Diff & Divergence Analyst",
+        goal="Help detect deviations from the MCM v3 default implementation by comparing domain branches and flagging unexpected changes outside allowed customization areas.",
+        backstory=(
+            "You are an expert in the MCM v3 architecture, which is a modular TypeScript/NestJS platform structured for domain isolation. "
+            "Each integration is expected to customize billing channel logic exclusively under `src/aggregator/channels/<network>/<billing_channel>`, "
+            "based on a default implementation rooted in `aggregator/hyve`. However, in practice, domain branches (e.g., domains/ng.mycontent.mobi) often contain changes outside these paths, "
+            "leading to fragile or undocumented behavior.\n\n"
+            "Your job is to:\n"
+            "- Compare a given domain branch to the reference (e.g., default-integration).\n"
+            "- Exclude changes inside the channels directory.\n"
+            "- Highlight all other diffs, per line.\n"
+            "- Additionally, perform AST-based inspection of changed TypeScript files, focusing on inserted logic inside method bodies (like conditionals or guards).\n\n"
+            "This allows developers to quickly identify where integration-specific logic has leaked into shared layers, breaking intended modularity."
+        ),
+        tools=[
+            get_query_tool("ts_tool").search,
+            git_tool.read_file_at_ref,
+            git_tool.list_tree_at_ref,
+            git_tool.grep_at_ref,
+            git_tool.grep_file,
+            mcm_diff_tool.ts_structural_diff,
+            mcm_diff_tool.diff_to_html,
+            mcm_diff_tool.scan_branches
+        ],
+        llm=get_llm(LLM_MODELS["mcm_llm"]),
+        verbose=True
+    )
+
+def _build_architect_agent():
+    git_tool = get_git_tool()
+    k8s_yaml_tool = get_k8s_yaml_tool()
+    mcm_diff_tool = get_mcm_diff_tool()
+    return _make_agent(
+        role="Lead Software Architect",
+        goal="Answer questions using knowledge from all code and context sources.",
+        backstory="You coordinate multiple specialists to generate accurate system-level insights.",
+        tools=[
+            get_all_code_tool().search,
+            *[get_query_tool(name).search for name in QUERY_TOOLS],
+            *[get_ast_tool(name).search for name in AST_TOOLS],
+            k8s_yaml_tool.find_metadata, k8s_yaml_tool.describe,
+            git_tool.read_file_at_ref, git_tool.grep_at_ref, git_tool.grep_file,
+            mcm_diff_tool.ts_structural_diff, mcm_diff_tool.diff_to_html
+        ],
+        llm=get_llm(LLM_MODELS["architect_llm"]),
+        verbose=True
+    )
+
+AGENT_BUILDERS = {
+    "docs_agent": _build_docs_agent,
+    "java_agent": _build_java_agent,
+    "go_agent": _build_go_agent,
+    "php_agent": _build_php_agent,
+    "ts_agent": _build_ts_agent,
+    "py_agent": _build_py_agent,
+    "kubernetes_agent": _build_kubernetes_agent,
+    "mcm_agent": _build_mcm_agent,
+    "architect_agent": _build_architect_agent,
+}
+
+# Agent -> LLM key, so callers can tell which agents share an Ollama model
+AGENT_LLMS = {
+    "docs_agent": "docs_llm",
+    "java_agent": "java_llm",
+    "go_agent": "go_llm",
+    "php_agent": "php_llm",
+    "ts_agent": "ts_llm",
+    "py_agent": "py_llm",
+    "kubernetes_agent": "k8s_llm",
+    "mcm_agent": "mcm_llm",
+    "architect_agent": "architect_llm",
+}
+
+def get_agent_model(name):
+    return LLM_MODELS[AGENT_LLMS[name]]
+
+@lru_cache(maxsize=None)
+def get_agent(name):
+    with _timed(name):
+        return AGENT_BUILDERS[name]()
+
+
+# ─────────────────────────────────────────────────────────────
+# Backwards-compatible module attributes (PEP 562)
+# ─────────────────────────────────────────────────────────────
+_LAZY_ATTRIBUTES = {
+    "embedding": get_embedding,
+    "vectorstore": get_vectorstore,
+    "retriever": get_retriever,
+    "all_code_tool": get_all_code_tool,
+    "git_tool": get_git_tool,
+    "k8s_yaml_tool": get_k8s_yaml_tool,
+    "mcm_diff_tool": get_mcm_diff_tool,
+    "stream_handler": get_stream_handler,
+    **{name: (lambda name=name: get_query_tool(name)) for name in QUERY_TOOLS},
+    **{name: (lambda name=name: get_llm(LLM_MODELS[name])) for name in LLM_MODELS},
+    **{name: (lambda name=name: get_ast_tool(name)) for name in AST_TOOLS},
+    **{name: (lambda name=name: get_agent(name)) for name in AGENT_BUILDERS},
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
+
+def startup_report():
+    """
+    Import time of this module plus the time spent building each component
+    so far, slowest first.
+    """
+    lines = [f"import crew_agents: {IMPORT_SECONDS * 1000:.0f} ms"]
+    lines += [f"{name}: {seconds * 1000:.0f} ms"
+              for name, seconds in sorted(BUILD_TIMINGS.items(), key=lambda item: item[1], reverse=True)]
+    return "\n".join(lines)
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
@@ -0,0 +1,140 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from util import get_logger
+
+
+class SpecialistResult(NamedTuple):
+    agent: str
+    model: str
+    status: str  # "ok" | "timeout" | "error"
+    answer: str
+    seconds: float
+
+
+def _run_crew(agent, question: str) -> str:
+    from crewai import Crew, Task
+    task = Task(description=question, agent=agent)
+    return str(Crew(agents=[agent], tasks=[task], verbose=False).run())
+
+
+# ─────────────────────────────────────────────────────────────
+# Specialist Fan-out: independent specialists queried concurrently
+# ─────────────────────────────────────────────────────────────
+class SpecialistFanOut:
+    """
+    Runs one single-agent crew per specialist at the same time and merges
+    whatever comes back.
+
+    Crews are blocking, so each runs in a worker thread of a per-run executor.
+    A semaphore per Ollama model (and one for the whole host) keeps a single
+    local Ollama from being oversubscribed; specialists on different models
+    run in parallel. A specialist that exceeds `timeout` is reported as
+    missing instead of holding up the answer. Its thread cannot be cancelled;
+    it finishes in the background and its result is discarded. It keeps its
+    model and host permits until then, since it is still calling Ollama, so
+    the next specialist on that model waits for it rather than piling on.
+    """
+
+    def __init__(self, agent_factory: Callable[[str], object], model_of: Callable[[str], str],
+                 per_model_limit: int = 1, host_limit: int = 4, timeout: float = 180.0,
+                 runner: Callable[[object, str], str] = _run_crew):
+        self.logger = get_logger(self)
+        self.agent_factory = agent_factory
+        self.model_of = model_of
+        self.per_model_limit = per_model_limit
+        self.host_limit = host_limit
+        self.timeout = timeout
+        self.runner = runner
+
+    async def _run_one(self, name: str, question: str, model_locks: Dict[str, asyncio.Semaphore],
+                       host_lock: asyncio.Semaphore, executor: ThreadPoolExecutor) -> SpecialistResult:
+        model = self.model_of(name)
+        started = time.perf_counter()
+        locks = (model_locks[model], host_lock)
+        try:
+            await self._acquire(locks)
+            try:
+                agent = self.agent_factory(name)
+                # Carry the caller's context so streamed events reach its request
+                future = executor.submit(contextvars.copy_context().run, self.runner, agent, question)
+            except BaseException:
+                self._release(locks)
+                raise
+            # Permits follow the worker thread, not this coroutine, which may give up on it first
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda _: self._release_from_thread(loop, locks))
+            answer = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            status, answer = "timeout", ""
+        except Exception as e:
+            status, answer = "error", str(e)
+        seconds = time.perf_counter() - started
+        self.logger.info(f"{'✅' if status == 'ok' else '⚠️'} {name} ({model}) {status} in {seconds:.1f}s")
+        return SpecialistResult(name, model, status, answer, seconds)
+
+    @staticmethod
+    async def _acquire(locks: Sequence[asyncio.Semaphore]) -> None:
+        held = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                held.append(lock)
+        except BaseException:
+            SpecialistFanOut._release(held)
+            raise
+
+    @staticmethod
+    def _release(locks: Sequence[asyncio.Semaphore]) -> None:
+        for lock in locks:
+            lock.release()
+
+    @staticmethod
+    def _release_from_thread(loop: asyncio.AbstractEventLoop, locks: Sequence[asyncio.Semaphore]) -> None:
+        # Runs in the worker thread; asyncio semaphores must be released on their loop
+        try:
+            loop.call_soon_threadsafe(SpecialistFanOut._release, locks)
+        except RuntimeError:
+            pass  # the fan-out is over and its loop is closed; nobody is waiting for the permits
+
+    async def gather(self, question: str, agent_names: Sequence[str],
+                     executor: ThreadPoolExecutor) -> List[SpecialistResult]:
+        model_locks = {self.model_of(name): asyncio.Semaphore(self.per_model_limit) for name in agent_names}
+        host_lock = asyncio.Semaphore(self.host_limit)
+        return list(await asyncio.gather(
+            *(self._run_one(name, question, model_locks, host_lock, executor) for name in agent_names)))
+
+    def run(self, question: str, agent_names: Sequence[str]) -> List[SpecialistResult]:
+        started = time.perf_counter()
+        # Not asyncio's default executor: asyncio.run would wait for timed-out threads on exit
+        executor = ThreadPoolExecutor(max_workers=max(len(agent_names), 1), thread_name_prefix="specialist")
+        try:
+            results = asyncio.run(self.gather(question, agent_names, executor))
+        finally:
+            executor.shutdown(wait=False)
+        slowest = max((r.seconds for r in results), default=0.0)
+        self.logger.info(f"⏱️ Fan-out of {len(results)} specialists took {time.perf_counter() - started:.1f}s "
+                         f"(slowest {slowest:.1f}s, sum {sum(r.seconds for r in results):.1f}s)")
+        return results
+
+
+def merge_results(question: str, results: Sequence[SpecialistResult],
+                  missing_note: Optional[str] = None) -> str:
+    """
+    Task description for the architect: the question plus every specialist
+    answer that arrived, and a note on the ones that did not.
+    """
+    sections = [f"Question: {question}", "", "Findings from specialists:"]
+    for r in results:
+        if r.status == "ok":
+            sections.append(f"\n## {r.agent} ({r.model})\n{r.answer.strip()}")
+    missing = [f"{r.agent} ({r.status})" for r in results if r.status != "ok"]
+    if missing:
+        sections.append(f"\nNo answer from: {', '.join(missing)}. "
+                        + (missing_note or "Use your own tools to cover those areas if they matter."))
+    sections.append("\nCombine these findings into one answer and resolve any conflicts between them.")
+    return "\n".join(sections)
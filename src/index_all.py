@@ -1,71 +1,368 @@
 import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.document_loaders import TextLoader, JSONLoader, CSVLoader, PyPDFLoader
 from langchain.vectorstores import Chroma
-from src.util import get_config, get_logger
+from src.code_chunker import symbol_chunks
+from src.index_manifest import IndexManifest, chunk_ids_for, file_sha256
+from src.lexical_index import LexicalIndex
+from src.util import get_config, get_config_value, get_logger
+
+VECTOR_STORE_DIR = "vector_store"
+MANIFEST_PATH = os.path.join(VECTOR_STORE_DIR, "index_manifest.json")
+LEXICAL_DIR = os.path.join(VECTOR_STORE_DIR, "lexical")
+MCM_PDF_PATH = Path("/Users/justinrobinson/Documents/mcmv3-doc.pdf")
+
+CODE_EXTENSIONS = {
+    ".java": "java",
+    ".go": "go",
+    ".ts": "ts",
+    ".php": "php",
+    ".py": "python",
+}
+
+_DONE = object()
+_splitter = None
+
+
+def _get_splitter() -> RecursiveCharacterTextSplitter:
+    # One splitter per worker process, created on first use
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
+    return _splitter
+
+
+def _load_chunks(path: str, source_type: str, chunker: str = "recursive",
+                 max_chars: int = 1200) -> List[Tuple[str, Dict[str, Any]]]:
+    language = CODE_EXTENSIONS.get(os.path.splitext(path)[1])
+    if chunker == "symbol" and source_type == "code" and language:
+        try:
+            symbol_results = symbol_chunks(path, language, max_chars=max_chars)
+        except Exception:
+            symbol_results = None  # unparsable file: fall back to the character splitter
+        if symbol_results:
+            for _, metadata in symbol_results:
+                metadata["source_type"] = source_type
+                metadata["language"] = language
+            return symbol_results
+
+    if source_type == "slack":
+        loader = JSONLoader(path, jq_schema=".", text_content=False)
+    elif source_type == "csv":
+        loader = CSVLoader(path)
+    elif source_type == "mcm_pdf":
+        loader = PyPDFLoader(path)
+    else:
+        loader = TextLoader(path)
+    chunks = _get_splitter().split_documents(loader.load())
+
+    results = []
+    for c in chunks:
+        c.metadata["source_type"] = source_type
+        c.metadata["chunker"] = "recursive"
+        if language:
+            c.metadata["language"] = language
+        if source_type == "mcm_pdf":
+            c.metadata["source"] = "mcm_v3_arch_doc"
+        results.append((c.page_content, c.metadata))
+    return results
+
+
+def _load_and_split(path: str, source_type: str, previous_sha256: Optional[str],
+                    chunker: str = "recursive", max_chars: int = 1200) -> Dict[str, Any]:
+    """
+    Worker-process entry point: hash, load and split one file.
+
+    Returns plain (text, metadata) pairs rather than Documents to keep the
+    payload sent back to the parent process small.
+    """
+    try:
+        stat = os.stat(path)
+        digest = file_sha256(path)
+        if digest == previous_sha256:
+            return {"path": path, "stat": stat, "sha256": digest, "unchanged": True}
+        return {
+            "path": path,
+            "stat": stat,
+            "sha256": digest,
+            "source_type": source_type,
+            "chunks": _load_chunks(path, source_type, chunker, max_chars),
+        }
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+
 
 class DocumentProcessor:
     def __init__(self):
         self.logger = get_logger(self)
         self.config = get_config()
+        self.code_directory = get_config_value("SYSTEM_PATHS.CODE_DIR", "data/code")
+        self.docs_directory = get_config_value("SYSTEM_PATHS.DOCS_DIR", "data/docs")
+        self.slack_directory = get_config_value("SYSTEM_PATHS.SLACK_EXPORT_DIR", "data/slack")
+        self.workers = get_config_value("INDEX.WORKERS", 0) or os.cpu_count() or 1
+        self.queue_size = get_config_value("INDEX.QUEUE_SIZE", 256)
+        self.embed_batch_size = get_config_value("INDEX.EMBED_BATCH_SIZE", 64)
+        self.upsert_batch_size = get_config_value("INDEX.UPSERT_BATCH_SIZE", 512)
+        # "symbol" splits code at class/function boundaries; "recursive" is the plain character splitter
+        self.chunker = get_config_value("INDEX.CHUNKER", "symbol")
+        self.chunk_max_chars = get_config_value("INDEX.CHUNK_MAX_CHARS", 1200)
+        self.manifest = IndexManifest(MANIFEST_PATH)
+        self.lexical = LexicalIndex(LEXICAL_DIR)
 
-    def process_documents(self):
-        EXTENSIONS = [".java", ".go", ".ts", ".php", ".py"]
-        splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-        embedding = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-        all_chunks = []
+    def _backfill_lexical(self, vectorstore: Chroma, page_size: int = 1000) -> int:
+        """
+        Fills an empty lexical index from the chunks already in Chroma, for
+        stores that were built before the lexical index existed.
+        """
+        offset = 0
+        while True:
+            page = vectorstore._collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return offset
+            self.lexical.upsert(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
 
-        # 1. Load and split source code files
-        for root, _, files in os.walk(Config.code_directory):
+    def _iter_source_files(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yields (path, source_type) for every file that belongs in the index.
+        """
+        # 1. Source code files and 4. CSV files share the code directory walk
+        for root, _, files in os.walk(self.code_directory):
             for file in files:
-                if any(file.endswith(ext) for ext in EXTENSIONS):
-                    loader = TextLoader(os.path.join(root, file))
-                    docs = loader.load()
-                    chunks = splitter.split_documents(docs)
-                    all_chunks.extend(chunks)
-
-        # 2. Load and split documentation files
-        for root, _, files in os.walk(Config.docs_directory):
+                ext = os.path.splitext(file)[1]
+                if ext in CODE_EXTENSIONS:
+                    yield os.path.join(root, file), "code"
+                elif ext == ".csv":
+                    yield os.path.join(root, file), "csv"
+
+        # 2. Documentation files
+        for root, _, files in os.walk(self.docs_directory):
             for file in files:
                 if file.endswith(".md") or file.endswith(".txt"):
-                    loader = TextLoader(os.path.join(root, file))
-                    docs = loader.load()
-                    chunks = splitter.split_documents(docs)
-                    all_chunks.extend(chunks)
+                    yield os.path.join(root, file), "docs"
 
-        # 3. Load and split Slack JSON exports
-        for root, _, files in os.walk(Config.slack_directory):
+        # 3. Slack JSON exports
+        for root, _, files in os.walk(self.slack_directory):
             for file in files:
                 if file.endswith(".json"):
-                    loader = JSONLoader(os.path.join(root, file))
-                    docs = loader.load()
-                    chunks = splitter.split_documents(docs)
-                    all_chunks.extend(chunks)
+                    yield os.path.join(root, file), "slack"
 
-        # 4. Load and split CSV files
-        for root, _, files in os.walk(Config.code_directory):
-            for file in files:
-                if file.endswith(".csv"):
-                    loader = CSVLoader(os.path.join(root, file))
-                    docs = loader.load()
-                    chunks = splitter.split_documents(docs)
-                    all_chunks.extend(chunks)
-
-        # 5. Special: Load and tag MCM v3 PDF documentation
-        mcm_pdf_path = Path("/Users/justinrobinson/Documents/mcmv3-doc.pdf")
-        if os.path.exists(mcm_pdf_path):
-            loader = PyPDFLoader(mcm_pdf_path)
-            docs = loader.load()
-            chunks = splitter.split_documents(docs)
-            for c in chunks:
-                c.metadata["source"] = "mcm_v3_arch_doc"
-            all_chunks.extend(chunks)
-            self.logger.info(f"📘 Loaded and tagged MCM PDF with {len(chunks)} chunks")
-
-        # 6. Embed and store in Chroma
-        self.logger.info(f"🔢 Total chunks to embed: {len(all_chunks)}")
-        vectorstore = Chroma.from_documents(all_chunks, embedding=embedding, persist_directory="vector_store")
-        self.logger.info("✅ All documents indexed into Chroma.")
+        # 5. Special: MCM v3 PDF documentation
+        if os.path.exists(MCM_PDF_PATH):
+            yield str(MCM_PDF_PATH), "mcm_pdf"
+
+    def _chunker_for(self, source_type: str) -> str:
+        return self.chunker if source_type == "code" else "recursive"
+
+    def _is_current(self, path: str, source_type: str) -> bool:
+        # Chunks made by a different chunker are stale even if the file is not
+        entry = self.manifest.get(path)
+        return entry is not None and entry.get("chunker", "recursive") == self._chunker_for(source_type)
+
+    def _produce(self, candidates: List[Tuple[str, str]], out_queue: queue.Queue) -> None:
+        """
+        Fans load+split out to a process pool and feeds results into a bounded
+        queue. The queue blocking on put() is what keeps memory flat: workers
+        can never run further ahead of the embedder than queue_size files.
+
+        If the pool itself fails (e.g. a worker is killed), every file not yet
+        delivered is queued as an `aborted` error so the run reports it.
+        """
+        delivered = set()
+
+        def deliver(result: Dict[str, Any]) -> None:
+            delivered.add(result["path"])
+            out_queue.put(result)
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = set()
+                for path, source_type in candidates:
+                    entry = self.manifest.get(path)
+                    previous = entry["sha256"] if entry and self._is_current(path, source_type) else None
+                    in_flight.add(pool.submit(_load_and_split, path, source_type, previous,
+                                              self._chunker_for(source_type), self.chunk_max_chars))
+                    if len(in_flight) >= self.workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            deliver(future.result())
+                for future in in_flight:
+                    deliver(future.result())
+        except Exception as e:
+            self.logger.error(f"❌ Loader pool failed: {e!r}")
+            for path, _ in candidates:
+                if path not in delivered:
+                    out_queue.put({"path": path, "error": repr(e), "aborted": True})
+        finally:
+            out_queue.put(_DONE)
+
+    def process_documents(self) -> Dict[str, Any]:
+        """
+        Incrementally syncs the Chroma store with the source directories.
+
+        Files whose mtime/size match the manifest are skipped without reading.
+        The rest are hashed, loaded and split in a process pool, and the
+        resulting chunks are embedded in fixed-size batches and upserted into
+        Chroma batch by batch, so peak memory is bounded by the batch and queue
+        sizes rather than by the size of the corpus.
+        """
+        embedding = HuggingFaceEmbeddings(
+            model_name="all-MiniLM-L6-v2",
+            encode_kwargs={"batch_size": self.embed_batch_size},
+        )
+        vectorstore = Chroma(persist_directory=VECTOR_STORE_DIR, embedding_function=embedding)
+        lexical_dirty = False
+        if self.manifest.files and self.lexical.count() == 0:
+            backfilled = self._backfill_lexical(vectorstore)
+            self.logger.info(f"🔤 Backfilled lexical index with {backfilled} existing chunks")
+            lexical_dirty = True
+
+        stats = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0, "failed": 0, "aborted": 0, "chunks": 0,
+                 "embed_seconds": 0.0, "chunker": self.chunker}
+        seen = []
+        candidates = []
+        for path, source_type in self._iter_source_files():
+            seen.append(path)
+            try:
+                if self.manifest.is_unchanged(path, os.stat(path)) and self._is_current(path, source_type):
+                    stats["skipped"] += 1
+                    continue
+            except OSError:
+                stats["failed"] += 1
+                continue
+            candidates.append((path, source_type))
+        self.logger.info(f"🔎 {len(candidates)} files to check, {stats['skipped']} unchanged")
+
+        out_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        producer = threading.Thread(target=self._produce, args=(candidates, out_queue), daemon=True)
+        producer.start()
+
+        pending_ids: List[str] = []
+        pending_texts: List[str] = []
+        pending_metadatas: List[Dict[str, Any]] = []
+        pending_manifest: List[Dict[str, Any]] = []
+        started = time.monotonic()
+        last_report = started
+        files_done = 0
+
+        def flush():
+            # Embed in CPU-sized batches, then upsert the whole buffer in one call
+            if pending_texts:
+                embeddings = []
+                embed_started = time.monotonic()
+                for i in range(0, len(pending_texts), self.embed_batch_size):
+                    embeddings.extend(embedding.embed_documents(pending_texts[i:i + self.embed_batch_size]))
+                stats["embed_seconds"] += time.monotonic() - embed_started
+                vectorstore._collection.upsert(
+                    ids=list(pending_ids),
+                    embeddings=embeddings,
+                    metadatas=list(pending_metadatas),
+                    documents=list(pending_texts),
+                )
+                self.lexical.upsert(pending_ids, pending_texts, pending_metadatas)
+                stats["chunks"] += len(pending_texts)
+            # Manifest entries only become durable once their chunks are stored
+            if pending_manifest:
+                self.manifest.bump_generation()
+            for result in pending_manifest:
+                self.manifest.update(result["path"], result["stat"], result["sha256"],
+                                     result["ids"], result["source_type"], self._chunker_for(result["source_type"]))
+            pending_ids.clear()
+            pending_texts.clear()
+            pending_metadatas.clear()
+            pending_manifest.clear()
+
+        while True:
+            result = out_queue.get()
+            if result is _DONE:
+                break
+            files_done += 1
+            path = result["path"]
+
+            if "error" in result:
+                if result.get("aborted"):
+                    stats["aborted"] += 1  # reported once below rather than per file
+                else:
+                    self.logger.warning(f"⚠️ Failed to load {path}: {result['error']}")
+                stats["failed"] += 1
+                continue
+            if result.get("unchanged"):
+                self.manifest.touch(path, result["stat"])
+                stats["skipped"] += 1
+                continue
+
+            entry = self.manifest.get(path)
+            if entry and entry["chunk_ids"]:
+                vectorstore.delete(ids=entry["chunk_ids"])
+                self.lexical.delete(entry["chunk_ids"])
+            ids = chunk_ids_for(path, len(result["chunks"]))
+            for chunk_id, (text, metadata) in zip(ids, result["chunks"]):
+                pending_ids.append(chunk_id)
+                pending_texts.append(text)
+                pending_metadatas.append(metadata)
+            result["ids"] = ids
+            del result["chunks"]
+            pending_manifest.append(result)
+            stats["updated" if entry else "added"] += 1
+
+            if len(pending_texts) >= self.upsert_batch_size:
+                flush()
+                vectorstore.persist()
+                self.manifest.save()
+
+            now = time.monotonic()
+            if now - last_report >= 30:
+                elapsed = now - started
+                self.logger.info(
+                    f"⏱️ {files_done}/{len(candidates)} files, {stats['chunks']} chunks "
+                    f"({files_done / elapsed:.1f} files/s, {stats['chunks'] / elapsed:.1f} chunks/s)"
+                )
+                last_report = now
+
+        producer.join()
+        flush()
+
+        # 6. Drop chunks of files that were removed since the last run
+        removed = self.manifest.missing(seen)
+        if removed:
+            self.manifest.bump_generation()
+        for path in removed:
+            stale_ids = self.manifest.remove(path)
+            if stale_ids:
+                vectorstore.delete(ids=stale_ids)
+                self.lexical.delete(stale_ids)
+            stats["deleted"] += 1
+
+        vectorstore.persist()
+        self.manifest.save()
+        if lexical_dirty or stats["added"] or stats["updated"] or stats["deleted"] \
+                or not os.path.exists(os.path.join(LEXICAL_DIR, "meta.json")):
+            lexical_stats = self.lexical.compile()
+            self.logger.info(f"🔤 Lexical index: {lexical_stats['docs']} chunks, {lexical_stats['terms']} terms")
+        # Only now do retrieval caches see the new generation, so none caches hits from the old BM25 arrays
+        self.manifest.publish_generation()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.logger.info(
+            f"{'⚠️' if stats['failed'] else '✅'} Index synced: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['deleted']} deleted, {stats['skipped']} skipped, {stats['failed']} failed — "
+            f"{stats['chunks']} chunks in {elapsed:.1f}s "
+            f"({files_done / elapsed:.1f} files/s, {stats['chunks'] / elapsed:.1f} chunks/s)"
+        )
+        if stats["aborted"]:
+            self.logger.error(f"❌ {stats['aborted']} files were never processed because the loader pool failed; "
+                              f"they stay out of the manifest and are retried on the next run")
+        indexed_files = stats["added"] + stats["updated"]
+        self.logger.info(
+            f"🧩 Chunker `{self.chunker}`: {stats['chunks']} chunks for {indexed_files} files "
+            f"({stats['chunks'] / max(indexed_files, 1):.1f} per file), "
+            f"embedding took {stats['embed_seconds']:.1f}s "
+            f"({stats['chunks'] / max(stats['embed_seconds'], 1e-6):.1f} chunks/s)"
+        )
+        return stats
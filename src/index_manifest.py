@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Streams a file through SHA-256 so large files never sit in memory whole.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids_for(path: str, count: int) -> List[str]:
+    """
+    Deterministic vector-store IDs for the chunks of one file, so a re-index
+    of the same path always replaces the same IDs.
+    """
+    prefix = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return [f"{prefix}:{i}" for i in range(count)]
+
+
+def generation_path(manifest_path: str) -> str:
+    return os.path.join(os.path.dirname(manifest_path), "index_generation")
+
+
+def read_generation(manifest_path: str) -> int:
+    """
+    Current index generation without parsing the whole manifest. Readers
+    such as the retrieval caches poll this to notice a re-index.
+    """
+    try:
+        with open(generation_path(manifest_path), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+# ─────────────────────────────────────────────────────────────
+# Index Manifest: per-file record of what is in the vector store
+# ─────────────────────────────────────────────────────────────
+class IndexManifest:
+    """
+    Persistent map of indexed file path -> {mtime, size, sha256, chunk_ids, source_type, chunker}.
+
+    The manifest lets DocumentProcessor embed only new or changed files and
+    delete the chunks of files that have disappeared since the last run.
+    `generation` is bumped whenever the stored chunks change. Readers only see
+    it once `publish_generation()` mirrors it to a small side file, which the
+    indexer does after every store (vector and lexical) has been updated.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.generation = 0
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") == self.VERSION:
+            self.files = data.get("files", {})
+            self.generation = data.get("generation", 0)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "generation": self.generation, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+    def publish_generation(self) -> None:
+        gen_path = generation_path(str(self.path))
+        with open(gen_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(str(self.generation))
+        os.replace(gen_path + ".tmp", gen_path)
+
+    def bump_generation(self) -> None:
+        self.generation += 1
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(path)
+
+    def is_unchanged(self, path: str, stat: os.stat_result) -> bool:
+        """
+        Cheap check: same mtime and size means the file is not re-hashed.
+        """
+        entry = self.files.get(path)
+        return entry is not None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size
+
+    def update(self, path: str, stat: os.stat_result, sha256: str, chunk_ids: List[str], source_type: str,
+               chunker: str = "recursive") -> None:
+        self.files[path] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": sha256,
+            "chunk_ids": chunk_ids,
+            "source_type": source_type,
+            "chunker": chunker,
+        }
+
+    def touch(self, path: str, stat: os.stat_result) -> None:
+        """
+        Records a new mtime/size for a file whose content hash did not change.
+        """
+        entry = self.files[path]
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+
+    def remove(self, path: str) -> List[str]:
+        entry = self.files.pop(path, None)
+        return entry["chunk_ids"] if entry else []
+
+    def missing(self, seen: Iterable[str]) -> List[str]:
+        """
+        Paths in the manifest that were not seen during the current walk.
+        """
+        seen = set(seen)
+        return [p for p in self.files if p not in seen]
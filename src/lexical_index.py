@@ -0,0 +1,273 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+ARRAYS = ("term_hashes", "term_offsets", "postings_doc", "postings_tf", "doc_length", "doc_language", "doc_ids")
+
+
+def code_tokens(text: str) -> List[str]:
+    """
+    "publishKafkaEvent(user_id)" -> ["publishkafkaevent", "publish", "kafka", "event",
+                                     "user_id", "user", "id"]
+
+    The whole identifier is kept so exact lookups score highest, and its
+    camelCase / snake_case parts are added so partial names still match.
+    """
+    tokens = []
+    for identifier in IDENTIFIER_RE.findall(text):
+        whole = identifier.lower()
+        tokens.append(whole)
+        parts = [p.lower() for piece in identifier.split("_") for p in CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1)
+    return tokens
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ─────────────────────────────────────────────────────────────
+# Lexical Index: BM25 over the same chunks as the vector store
+# ─────────────────────────────────────────────────────────────
+class LexicalIndex:
+    """
+    BM25 index over the chunks in the vector store, keyed by the same chunk IDs.
+
+    index_all keeps a SQLite store of per-chunk term frequencies in sync with
+    every Chroma upsert/delete, and `compile()` turns it into flat numpy
+    arrays (postings sorted by term hash, document lengths and languages).
+    Searches memory-map those arrays, so loading the index costs no parsing
+    and only the postings a query touches are paged in.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunks (
+            id TEXT PRIMARY KEY,
+            length INTEGER NOT NULL,
+            language TEXT
+        );
+        CREATE TABLE IF NOT EXISTS terms (
+            term TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (term, chunk_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_terms_chunk ON terms(chunk_id);
+    """
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        self.directory = directory
+        self.db_path = os.path.join(directory, "terms.sqlite")
+        self.k1 = k1
+        self.b = b
+        self._conn: Optional[sqlite3.Connection] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._meta: Dict[str, Any] = {}
+        self._loaded_stamp: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # ── writer side (index_all) ───────────────────────────────
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def count(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def upsert(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        conn = self._db()
+        with conn:
+            self._delete(conn, ids)
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                counts = Counter(code_tokens(text))
+                conn.execute("INSERT INTO chunks (id, length, language) VALUES (?, ?, ?)",
+                             (chunk_id, sum(counts.values()), (metadata or {}).get("language")))
+                conn.executemany("INSERT INTO terms (term, chunk_id, tf) VALUES (?, ?, ?)",
+                                 ((term, chunk_id, tf) for term, tf in counts.items()))
+
+    def delete(self, ids: Sequence[str]) -> None:
+        conn = self._db()
+        with conn:
+            self._delete(conn, ids)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, ids: Sequence[str]) -> None:
+        conn.executemany("DELETE FROM terms WHERE chunk_id = ?", ((i,) for i in ids))
+        conn.executemany("DELETE FROM chunks WHERE id = ?", ((i,) for i in ids))
+
+    def compile(self, batch_size: int = 65536) -> Dict[str, int]:
+        """
+        Rebuilds the memory-mapped arrays from the SQLite store. Each array is
+        written next to the old one and swapped in with os.replace; meta.json
+        goes last and tells readers to reload.
+
+        Postings are streamed from SQLite in term order, `batch_size` rows at
+        a time, straight into memory-mapped staging files; a second pass
+        copies each term's block into term-hash order. Memory use grows with
+        the number of distinct terms and chunks, not with total postings.
+        """
+        conn = self._db()
+        doc_rows = conn.execute("SELECT id, length, language FROM chunks ORDER BY id").fetchall()
+        doc_index = {chunk_id: i for i, (chunk_id, _, _) in enumerate(doc_rows)}
+        languages = sorted({lang for _, _, lang in doc_rows if lang})
+        language_codes = {lang: i + 1 for i, lang in enumerate(languages)}  # 0 = no language
+        os.makedirs(self.directory, exist_ok=True)
+
+        def output(name: str, dtype, length: int) -> np.ndarray:
+            path = os.path.join(self.directory, f"{name}.tmp.npy")
+            if not length:
+                np.save(path, np.zeros(0, dtype=dtype))
+                return np.load(path)
+            return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(length,))
+
+        # 1. Term order, as stored: one contiguous block of postings per term, docs ascending
+        n_postings = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        staged_doc = output("staged_doc", np.int32, n_postings)
+        staged_tf = output("staged_tf", np.int32, n_postings)
+        term_hash_list: List[int] = []
+        term_start_list: List[int] = []
+        last_term = None
+        filled = 0
+        cursor = conn.execute("SELECT term, chunk_id, tf FROM terms ORDER BY term, chunk_id")
+        while filled < n_postings:
+            rows = cursor.fetchmany(min(batch_size, n_postings - filled))
+            if not rows:
+                break
+            end = filled + len(rows)
+            staged_doc[filled:end] = [doc_index[chunk_id] for _, chunk_id, _ in rows]
+            staged_tf[filled:end] = [tf for _, _, tf in rows]
+            for i, (term, _, _) in enumerate(rows):
+                if term != last_term:
+                    term_hash_list.append(term_hash(term))
+                    term_start_list.append(filled + i)
+                    last_term = term
+            filled = end
+        cursor.close()
+
+        # 2. Term-hash order, which is what searches binary-search on
+        hashes = np.array(term_hash_list, dtype=np.uint64)
+        starts = np.array(term_start_list + [filled], dtype=np.int64)
+        order = np.argsort(hashes, kind="stable")
+        term_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.diff(starts)[order], out=term_offsets[1:])
+        postings_doc = output("postings_doc", np.int32, filled)
+        postings_tf = output("postings_tf", np.int32, filled)
+        for target, term in enumerate(order):
+            src, dst = slice(starts[term], starts[term + 1]), slice(term_offsets[target], term_offsets[target + 1])
+            postings_doc[dst] = staged_doc[src]
+            postings_tf[dst] = staged_tf[src]
+        for array in (postings_doc, postings_tf):
+            if isinstance(array, np.memmap):
+                array.flush()
+        del staged_doc, staged_tf, postings_doc, postings_tf
+        for name in ("staged_doc", "staged_tf"):
+            os.remove(os.path.join(self.directory, f"{name}.tmp.npy"))
+
+        doc_length = np.array([length for _, length, _ in doc_rows], dtype=np.int32)
+        arrays = {
+            "term_hashes": hashes[order],
+            "term_offsets": term_offsets,
+            "doc_length": doc_length,
+            "doc_language": np.array([language_codes.get(lang, 0) for _, _, lang in doc_rows], dtype=np.int16),
+            "doc_ids": np.array([chunk_id for chunk_id, _, _ in doc_rows], dtype=str),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(self.directory, f"{name}.tmp.npy"), array)
+        for name in ARRAYS:
+            os.replace(os.path.join(self.directory, f"{name}.tmp.npy"), os.path.join(self.directory, f"{name}.npy"))
+        meta = {
+            "docs": len(doc_rows),
+            "terms": len(order),
+            "avg_length": float(doc_length.mean()) if len(doc_length) else 0.0,
+            "languages": languages,
+            "built_at": time.time(),
+        }
+        tmp_path = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.directory, "meta.json"))
+        return {"docs": meta["docs"], "terms": meta["terms"], "postings": filled}
+
+    # ── reader side (retrieval) ───────────────────────────────
+
+    def _ensure_loaded(self) -> bool:
+        meta_path = os.path.join(self.directory, "meta.json")
+        try:
+            stamp = os.stat(meta_path).st_mtime_ns
+        except OSError:
+            return False
+        if stamp == self._loaded_stamp:
+            return True
+        with self._lock:
+            if stamp != self._loaded_stamp:
+                with open(meta_path, encoding="utf-8") as f:
+                    self._meta = json.load(f)
+                self._arrays = {name: np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+                                for name in ARRAYS}
+                self._loaded_stamp = stamp
+        return True
+
+    def search(self, query: str, language: Optional[str] = None, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Top-k (chunk_id, bm25_score) for the query, optionally limited to
+        chunks of one language.
+        """
+        if not self._ensure_loaded() or not self._meta.get("docs"):
+            return []
+        arrays, meta = self._arrays, self._meta
+        language_code = None
+        if language:
+            if language not in meta["languages"]:
+                return []
+            language_code = meta["languages"].index(language) + 1
+
+        n_docs = meta["docs"]
+        avg_length = meta["avg_length"] or 1.0
+        term_hashes = arrays["term_hashes"]
+        matched_docs: List[np.ndarray] = []
+        matched_scores: List[np.ndarray] = []
+        for term, query_tf in Counter(code_tokens(query)).items():
+            h = np.uint64(term_hash(term))
+            pos = int(np.searchsorted(term_hashes, h))
+            if pos >= len(term_hashes) or term_hashes[pos] != h:
+                continue
+            start, end = int(arrays["term_offsets"][pos]), int(arrays["term_offsets"][pos + 1])
+            docs = np.asarray(arrays["postings_doc"][start:end])
+            tf = np.asarray(arrays["postings_tf"][start:end], dtype=np.float64)
+            if language_code is not None:
+                mask = np.asarray(arrays["doc_language"][docs]) == language_code
+                docs, tf = docs[mask], tf[mask]
+                if not len(docs):
+                    continue
+            idf = math.log(1 + (n_docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            length = np.asarray(arrays["doc_length"][docs], dtype=np.float64)
+            contribution = idf * query_tf * tf * (self.k1 + 1) / (
+                tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+            matched_docs.append(docs)
+            matched_scores.append(contribution)
+        if not matched_docs:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(matched_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        top = np.argsort(-scores, kind="stable")[:k]
+        doc_ids = arrays["doc_ids"]
+        return [(str(doc_ids[docs[i]]), float(scores[i])) for i in top]
+
@@ -1,23 +1,66 @@
+import time
+
+_started = time.perf_counter()
 from crewai import Task, Crew
-from crew_agents import architect_agent, java_agent, go_agent, php_agent, docs_agent, ts_agent
+import crew_agents
+from fanout import SpecialistFanOut, merge_results
+from router import ARCHITECT, DOMAINS, QueryRouter
+from streaming import TerminalSink
+from util import get_config_value
+startup_seconds = time.perf_counter() - _started
+print(f"\n⏱️ Ready in {startup_seconds:.2f}s (crew_agents import {crew_agents.IMPORT_SECONDS * 1000:.0f} ms)")
+
+# The full crew, used when the router escalates to the architect
+CREW_AGENTS = [ARCHITECT, "java_agent", "go_agent", "php_agent", "docs_agent", "ts_agent"]
+ASYNC_FANOUT = get_config_value("ASYNC.ENABLED", True)
+STREAMING = get_config_value("STREAMING.ENABLED", True)
+# With streaming on, tokens and tool calls are printed as they arrive instead of crewai's verbose log
+VERBOSE = not STREAMING
 
 print("\n💬 Ask your question about the codebase:")
 user_input = input("> ")
 
-# You can swap in java_agent, go_agent, etc. if you want to route directly
-task = Task(
-    description=user_input,
-    agent=architect_agent
-)
-
-crew = Crew(
-    agents=[architect_agent, java_agent, go_agent, php_agent, docs_agent, ts_agent],
-    tasks=[task],
-    verbose=True
-)
+# Single-domain questions go straight to one specialist; the rest escalate to the architect
+router = QueryRouter(crew_agents.get_retriever)
+decision = router.route(user_input)
+print(f"\n🧭 Routed to {decision.agent}: {decision.reason} ({decision.seconds * 1000:.0f} ms)")
 
 print("\n🧠 AI is thinking...")
-result = crew.run()
+terminal = TerminalSink()
+with crew_agents.get_stream_handler().request(*([terminal] if STREAMING else [])) as request:
+    query_started = time.perf_counter()
+    if decision.agent != ARCHITECT:
+        agent = crew_agents.get_agent(decision.agent)
+        task = Task(description=user_input, agent=agent)
+        result = Crew(agents=[agent], tasks=[task], verbose=VERBOSE).run()
+    elif ASYNC_FANOUT:
+        # Specialists answer concurrently, then the architect merges their findings
+        specialists = [DOMAINS[d][0] for d in decision.scores if d in DOMAINS][:4] or CREW_AGENTS[1:]
+        fanout = SpecialistFanOut(
+            crew_agents.get_agent, crew_agents.get_agent_model,
+            per_model_limit=get_config_value("ASYNC.PER_MODEL_CONCURRENCY", 1),
+            host_limit=get_config_value("ASYNC.HOST_CONCURRENCY", 4),
+            timeout=get_config_value("ASYNC.AGENT_TIMEOUT", 180),
+        )
+        terminal.show_tokens = False  # specialists run at once; only their tool calls are shown
+        findings = fanout.run(user_input, specialists)
+        terminal.show_tokens = True
+        for r in findings:
+            print(f"   {'✅' if r.status == 'ok' else '⚠️'} {r.agent} ({r.model}): {r.status} in {r.seconds:.1f}s")
+        architect = crew_agents.get_agent(ARCHITECT)
+        task = Task(description=merge_results(user_input, findings), agent=architect)
+        result = Crew(agents=[architect], tasks=[task], verbose=VERBOSE).run()
+    else:
+        agents = [crew_agents.get_agent(name) for name in CREW_AGENTS]
+        task = Task(description=user_input, agent=agents[0])
+        result = Crew(agents=agents, tasks=[task], verbose=VERBOSE).run()
+
+    query_seconds = time.perf_counter() - query_started
+router.record(decision, query_seconds)
+if request.ttft is not None:
+    print(f"\n\n⏱️ First token after {request.ttft:.1f}s ({request.tokens} tokens streamed)")
+print(f"\n⏱️ First query answered in {query_seconds:.1f}s")
+print(crew_agents.startup_report())
 
 print("\n✅ Answer:\n")
-print(result)
\ No newline at end of file
+print(result)
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cachetools import TTLCache
+
+# (text, metadata, score): vector distance in "vector" mode, fused RRF score in "hybrid" mode
+Hit = Tuple[str, Dict[str, Any], float]
+RRF_K = 60
+HYBRID_POOL = 4
+
+
+def normalize_query(query: str) -> str:
+    # all-MiniLM-L6-v2 is uncased, so case and spacing do not change the embedding
+    return " ".join(query.lower().split())
+
+
+# ─────────────────────────────────────────────────────────────
+# Vector Retriever: language-filtered, batched Chroma queries
+# ─────────────────────────────────────────────────────────────
+class VectorRetriever:
+    """
+    Thin layer over the Chroma collection shared by all CodebaseQueryTools.
+
+    Language filtering is a `where` clause on the chunk metadata written by
+    index_all, so a Java search always gets k Java chunks instead of k chunks
+    of anything filtered afterwards.
+
+    In "hybrid" mode, the vector ranking is fused with the BM25 ranking from
+    the LexicalIndex (reciprocal rank fusion), so exact identifiers that the
+    embedding model blurs still surface.
+
+    Query embeddings and search results are kept in LRU caches with a TTL, so
+    a question repeated by several tools, agents or UI sessions is encoded and
+    searched once. The result cache is dropped whenever `generation()` (the
+    index generation written by index_all) changes; embeddings only depend
+    on the model and survive a re-index.
+    """
+
+    def __init__(self, vectorstore, embedding, lexical=None, generation: Callable[[], int] = lambda: 0,
+                 max_embeddings: int = 1024, embedding_ttl: float = 24 * 3600,
+                 max_results: int = 1024, result_ttl: float = 600, generation_check_interval: float = 2.0):
+        self.vectorstore = vectorstore
+        self.embedding = embedding
+        self.lexical = lexical
+        self._generation_source = generation
+        self._generation_check_interval = generation_check_interval
+        self._generation = generation()
+        self._generation_checked = time.monotonic()
+        self._embeddings: TTLCache = TTLCache(maxsize=max_embeddings, ttl=embedding_ttl)
+        self._results: TTLCache = TTLCache(maxsize=max_results, ttl=result_ttl)
+        self._counters = {"embedding_hits": 0, "embedding_misses": 0, "result_hits": 0, "result_misses": 0}
+        self._lock = threading.Lock()
+
+    def _check_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked < self._generation_check_interval:
+            return
+        self._generation_checked = now
+        current = self._generation_source()
+        if current != self._generation:
+            with self._lock:
+                self._generation = current
+                self._results.clear()
+
+    def embed_queries(self, queries: Sequence[str]) -> List[List[float]]:
+        keys = [normalize_query(q) for q in queries]
+        with self._lock:
+            missing = list(dict.fromkeys(k for k in keys if k not in self._embeddings))
+            self._counters["embedding_misses"] += len(missing)
+            self._counters["embedding_hits"] += len(keys) - len(missing)
+        vectors = dict(zip(missing, self.embedding.embed_documents(missing))) if missing else {}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._embeddings[key] = vector
+            return [vectors[k] if k in vectors else self._embeddings[k] for k in keys]
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embed_queries([query])[0]
+
+    @staticmethod
+    def _where(language: Optional[str]) -> Optional[Dict[str, Any]]:
+        return {"language": language} if language else None
+
+    def _query(self, vectors: List[List[float]], language: Optional[str], k: int) -> List[List[Tuple[str, Hit]]]:
+        response = self.vectorstore._collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            where=self._where(language),
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            [(chunk_id, (text, metadata, distance))
+             for chunk_id, text, metadata, distance in zip(ids, documents, metadatas, distances)]
+            for ids, documents, metadatas, distances in zip(
+                response["ids"], response["documents"], response["metadatas"], response["distances"])
+        ]
+
+    def _fuse(self, query: str, language: Optional[str], vector_hits: List[Tuple[str, Hit]],
+              k: int) -> List[Tuple[str, Optional[Hit], float]]:
+        """
+        Reciprocal rank fusion of the vector and BM25 rankings. Lexical-only
+        chunks come back without text; the caller fetches them in one batch.
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        hits: Dict[str, Hit] = {}
+        for rank, (chunk_id, hit) in enumerate(vector_hits):
+            scores[chunk_id] += 1.0 / (RRF_K + rank + 1)
+            hits[chunk_id] = hit
+        for rank, (chunk_id, _) in enumerate(self.lexical.search(query, language, k=k * HYBRID_POOL)):
+            scores[chunk_id] += 1.0 / (RRF_K + rank + 1)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(chunk_id, hits.get(chunk_id), score) for chunk_id, score in ranked]
+
+    def _fetch(self, chunk_ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        if not chunk_ids:
+            return {}
+        response = self.vectorstore._collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        return {chunk_id: (text, metadata) for chunk_id, text, metadata in zip(
+            response["ids"], response["documents"], response["metadatas"])}
+
+    def search(self, query: str, language: Optional[str] = None, k: int = 5, mode: str = "vector") -> List[Hit]:
+        return self.search_many([(query, language)], k=k, mode=mode)[0]
+
+    def search_many(self, requests: Sequence[Tuple[str, Optional[str]]], k: int = 5,
+                    mode: str = "vector") -> List[List[Hit]]:
+        """
+        Answers many (query, language) pairs at once. Cached pairs are served
+        from memory; for the rest, every distinct query is embedded in one
+        batch and the collection is queried once per distinct language with
+        all of that language's query vectors. `mode="hybrid"` widens the
+        vector pool and fuses it with the lexical ranking.
+        """
+        self._check_generation()
+        if mode == "hybrid" and self.lexical is None:
+            mode = "vector"
+        keys = [(normalize_query(q), language, k, mode) for q, language in requests]
+        results: List[Optional[List[Hit]]] = [None] * len(requests)
+        by_language: Dict[Optional[str], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        # The lexical side splits camelCase, so it gets the query as typed
+        originals = {key[0]: q for key, (q, _) in zip(keys, requests)}
+        with self._lock:
+            generation = self._generation
+            for i, key in enumerate(keys):
+                cached = self._results.get(key)
+                if cached is not None:
+                    results[i] = cached
+                    self._counters["result_hits"] += 1
+                else:
+                    by_language[key[1]][key[0]].append(i)
+                    self._counters["result_misses"] += 1
+        if not by_language:
+            return results
+
+        distinct = list(dict.fromkeys(q for positions in by_language.values() for q in positions))
+        vectors = dict(zip(distinct, self.embed_queries(distinct)))
+        found: Dict[Tuple[str, Optional[str]], List[Hit]] = {}
+        fused: Dict[Tuple[str, Optional[str]], List[Tuple[str, Optional[Hit], float]]] = {}
+        for language, positions in by_language.items():
+            queries = list(positions)
+            pool = k * HYBRID_POOL if mode == "hybrid" else k
+            for query, vector_hits in zip(queries, self._query([vectors[q] for q in queries], language, pool)):
+                if mode == "hybrid":
+                    fused[(query, language)] = self._fuse(originals[query], language, vector_hits, k)
+                else:
+                    found[(query, language)] = [hit for _, hit in vector_hits]
+
+        if fused:
+            fetched = self._fetch(list(dict.fromkeys(
+                chunk_id for ranked in fused.values() for chunk_id, hit, _ in ranked if hit is None)))
+            for pair, ranked in fused.items():
+                found[pair] = [
+                    (hit[0], hit[1], score) if hit is not None else (*fetched[chunk_id], score)
+                    for chunk_id, hit, score in ranked
+                    if hit is not None or chunk_id in fetched
+                ]
+
+        with self._lock:
+            for (query, language), hits in found.items():
+                if generation == self._generation:
+                    self._results[(query, language, k, mode)] = hits
+                for i in by_language[language][query]:
+                    results[i] = hits
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            embedding_lookups = counters["embedding_hits"] + counters["embedding_misses"]
+            result_lookups = counters["result_hits"] + counters["result_misses"]
+            return {
+                **counters,
+                "embedding_hit_rate": counters["embedding_hits"] / embedding_lookups if embedding_lookups else 0.0,
+                "result_hit_rate": counters["result_hits"] / result_lookups if result_lookups else 0.0,
+                "embeddings_cached": len(self._embeddings),
+                "results_cached": len(self._results),
+                "generation": self._generation,
+            }
@@ -0,0 +1,139 @@
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from util import get_logger
+
+ARCHITECT = "architect_agent"
+
+# Domain -> (agent, weighted lexical signals). Signals are lower-case regexes.
+DOMAINS: Dict[str, tuple] = {
+    "java": ("java_agent", {r"\bjava\b": 3, r"\bspring( boot)?\b": 3, r"\.java\b": 3, r"\bmaven\b|\bgradle\b": 2,
+                            r"\bjvm\b|\bkotlin\b": 1, r"\bbean\b|\bannotation\b": 1}),
+    "go": ("go_agent", {r"\bgo(lang)?\b": 2, r"\bin go\b": 2, r"\.go\b": 3, r"\bgoroutines?\b|\bchannels? in go\b": 3,
+                        r"\bgo\.mod\b": 3, r"\bstructs?\b|\binterfaces? in go\b": 1}),
+    "php": ("php_agent", {r"\bphp\b": 3, r"\.php\b": 3, r"\blaravel\b|\bsymfony\b|\bcomposer\b": 3,
+                          r"\blegacy monolith\b": 1}),
+    "ts": ("ts_agent", {r"\btypescript\b": 3, r"\.tsx?\b": 3, r"\bnestjs\b|\bangular\b|\breact\b": 2,
+                        r"\bfrontend\b|\bcomponents?\b|\bnpm\b": 1}),
+    "python": ("py_agent", {r"\bpython\b": 3, r"\.py\b": 3, r"\bdjango\b|\bflask\b|\bpip\b": 2, r"\bscripts?\b": 1}),
+    "k8s": ("kubernetes_agent", {r"\bk8s\b|\bkubernetes\b|\bkubectl\b": 3, r"\bhelm\b": 2,
+                                 r"\bpods?\b": 2, r"\bconfig ?maps?\b": 2, r"\bnamespaces?\b": 2, r"\bsecrets?\b": 1,
+                                 r"\bdeployments?\b|\bingress\b|\blabels?\b|\byaml\b": 1}),
+    "mcm": ("mcm_agent", {r"\bmcm\b": 3, r"\bdomains?/": 3, r"\bdefault-integration\b": 3,
+                          r"\bbilling channels?\b": 2, r"\bdrift\b|\bdiverge(nce|d)?\b|\bbranch(es)?\b": 1}),
+    "docs": ("docs_agent", {r"\bslack\b|\bwiki\b|\bconfluence\b": 3, r"\bdocs?\b|\bdocumentation\b": 2,
+                            r"\bwho\b|\bwhy did\b|\bdecided\b|\bdiscuss(ed|ion)\b": 1}),
+}
+# Questions that span systems always go to the architect
+CROSS_CUTTING = re.compile(
+    r"\barchitecture\b|\bend[- ]to[- ]end\b|\bacross\b|\boverall\b|\bsystem[- ]wide\b|"
+    r"\binteract(ions?)?\b|\bdata ?flow\b|\ball (services|repos|systems)\b"
+)
+# Vector-store metadata -> domain
+LANGUAGE_DOMAINS = {"java": "java", "go": "go", "php": "php", "ts": "ts", "python": "python"}
+SOURCE_TYPE_DOMAINS = {"docs": "docs", "slack": "docs", "mcm_pdf": "mcm"}
+
+
+class RouteDecision(NamedTuple):
+    agent: str
+    domain: Optional[str]
+    confidence: float
+    scores: Dict[str, float]
+    reason: str
+    seconds: float
+
+
+# ─────────────────────────────────────────────────────────────
+# Query Router: send single-domain questions straight to one specialist
+# ─────────────────────────────────────────────────────────────
+class QueryRouter:
+    """
+    Classifies a question by domain before any LLM runs.
+
+    Lexical signals (language names, file extensions, frameworks, k8s and
+    MCM vocabulary) are combined with the language / source_type metadata of
+    the nearest chunks in the vector store. A clear single winner goes to
+    that domain's specialist and its smaller model; cross-cutting or
+    ambiguous questions go to the architect with the full crew.
+    """
+
+    def __init__(self, retriever_factory: Optional[Callable[[], object]] = None,
+                 min_score: float = 3.0, min_margin: float = 1.5, vector_k: int = 10, vector_weight: float = 4.0):
+        self.logger = get_logger(self)
+        self.retriever_factory = retriever_factory
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.vector_k = vector_k
+        self.vector_weight = vector_weight
+        self._compiled = {domain: [(re.compile(p), w) for p, w in signals.items()]
+                          for domain, (_, signals) in DOMAINS.items()}
+        self._route_stats: Dict[str, List[float]] = defaultdict(list)
+
+    def lexical_scores(self, question: str) -> Dict[str, float]:
+        text = question.lower()
+        scores: Dict[str, float] = {}
+        for domain, signals in self._compiled.items():
+            score = sum(weight for pattern, weight in signals if pattern.search(text))
+            if score:
+                scores[domain] = float(score)
+        return scores
+
+    def vector_scores(self, question: str) -> Dict[str, float]:
+        """
+        Share of the nearest chunks per domain, scaled by `vector_weight`.
+        """
+        if self.retriever_factory is None:
+            return {}
+        try:
+            hits = self.retriever_factory().search(question, k=self.vector_k, mode="vector")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Vector routing signal unavailable: {e}")
+            return {}
+        domains = Counter()
+        for _, metadata, _ in hits:
+            metadata = metadata or {}
+            domain = LANGUAGE_DOMAINS.get(metadata.get("language")) or SOURCE_TYPE_DOMAINS.get(
+                metadata.get("source_type")) or ("mcm" if metadata.get("source") == "mcm_v3_arch_doc" else None)
+            if domain:
+                domains[domain] += 1
+        return {domain: self.vector_weight * count / len(hits) for domain, count in domains.items()} if hits else {}
+
+    def route(self, question: str) -> RouteDecision:
+        started = time.perf_counter()
+        scores = self.lexical_scores(question)
+        for domain, score in self.vector_scores(question).items():
+            scores[domain] = scores.get(domain, 0.0) + score
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_domain, top_score = ranked[0] if ranked else (None, 0.0)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        if CROSS_CUTTING.search(question.lower()):
+            agent, domain, reason = ARCHITECT, None, "cross-cutting question"
+        elif top_domain is None or top_score < self.min_score:
+            agent, domain, reason = ARCHITECT, None, "no clear domain"
+        elif top_score - runner_up < self.min_margin:
+            agent, domain, reason = ARCHITECT, None, f"ambiguous between {top_domain} and {ranked[1][0]}"
+        else:
+            agent, domain, reason = DOMAINS[top_domain][0], top_domain, f"{top_domain} ({top_score:.1f} vs {runner_up:.1f})"
+
+        confidence = (top_score - runner_up) / top_score if top_score else 0.0
+        decision = RouteDecision(agent, domain, round(confidence, 2), {d: round(s, 2) for d, s in ranked},
+                                 reason, time.perf_counter() - started)
+        self.logger.info(f"🧭 Routed to {agent}: {reason} in {decision.seconds * 1000:.0f} ms — "
+                         f"scores={decision.scores} question={question[:120]!r}")
+        return decision
+
+    def record(self, decision: RouteDecision, seconds: float) -> None:
+        """
+        End-to-end latency of a routed question, kept per agent.
+        """
+        self._route_stats[decision.agent].append(seconds)
+        self.logger.info(f"⏱️ {decision.agent} answered in {seconds:.1f}s ({decision.reason})")
+
+    def route_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            agent: {"count": len(times), "avg_seconds": sum(times) / len(times), "max_seconds": max(times)}
+            for agent, times in self._route_stats.items()
+        }
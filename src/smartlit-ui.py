@@ -1,103 +1,226 @@
+import json
+import queue
+import threading
 from pathlib import Path
 
 import streamlit as st
 from crewai import Task, Crew
-from crew_agents import architect_agent  # you should define this in crew_agents.py
+from crew_agents import get_agent, get_retriever, get_stream_handler
+from streaming import StreamlitSink
 import whisper
 import pyttsx3
-import soundfile as sf
 import numpy as np
-from streamlit_webrtc import webrtc_streamer, AudioProcessorBase
+from streamlit_webrtc import webrtc_streamer, AudioProcessorBase, WebRtcMode
 import av
-import streamlit as st
 from agent_tools import MCMGitDiffTool
+from agent_tools.mcm_git_diff_tool import REPORT_STYLE
 
 st.set_page_config(page_title="Codebase Assistant with Voice", layout="centered")
 st.title("🎙️ Codebase AI Chat Assistant")
 
-# Session state for chat
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-
-# Text input fallback
-user_input = st.text_input("Ask a question about your codebase:")
+# Voice input
+WHISPER_RATE = 16000  # whisper expects mono float32 at 16 kHz
+LIVE_CHUNK_SECONDS = 5
+LIVE_RECEIVER_FRAMES = 1024  # ~20 s of 20 ms WebRTC frames buffered while whisper runs
 
-# Microphone STT
-st.markdown("---")
-st.subheader("🎤 Or record your voice")
-audio_data = None
+@st.cache_resource
+def load_whisper(name="base"):
+    # Loaded once per process and shared by every session
+    return whisper.load_model(name)
 
 class AudioProcessor(AudioProcessorBase):
+    """
+    Resamples incoming WebRTC frames to 16 kHz mono as they arrive and keeps
+    them in memory; recv runs on streamlit-webrtc's worker thread.
+    """
+
     def __init__(self):
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=WHISPER_RATE)
         self.audio_frames = []
+        self.lock = threading.Lock()
 
     def recv(self, frame: av.AudioFrame) -> av.AudioFrame:
-        audio = frame.to_ndarray()
-        self.audio_frames.append(audio)
+        for resampled in self.resampler.resample(frame):
+            with self.lock:
+                self.audio_frames.append(resampled.to_ndarray().reshape(-1))
         return frame
 
-webrtc_ctx = webrtc_streamer(
-    key="stt", audio_processor_factory=AudioProcessor, media_stream_constraints={"audio": True, "video": False}
-)
-
-if st.button("Transcribe Voice") and webrtc_ctx.audio_processor:
-    audio_frames = webrtc_ctx.audio_processor.audio_frames
-    if audio_frames:
-        audio = np.concatenate(audio_frames)
-        sf.write("temp.wav", audio, 16000)
-
-        model = whisper.load_model("base")
-        result = model.transcribe("temp.wav")
-        user_input = result["text"]
-        st.success(f"You said: {user_input}")
-
-# Process query if available
-if user_input:
-    st.session_state.chat_history.append(("You", user_input))
-    task = Task(description=user_input, agent=architect_agent)
-    crew = Crew(agents=[architect_agent], tasks=[task], verbose=False)
-    with st.spinner("Thinking..."):
-        response = crew.run()
-    st.session_state.chat_history.append(("AI", response))
-
-    # Text-to-speech
-    engine = pyttsx3.init()
-    engine.say(response)
-    engine.runAndWait()
-
-# Chat history display
-st.markdown("---")
-st.subheader("📝 Chat History")
-for sender, message in st.session_state.chat_history:
-    st.markdown(f"**{sender}:** {message}")
+    def audio(self):
+        """
+        Samples recorded so far, as a float32 array in [-1, 1].
+        """
+        with self.lock:
+            frames = list(self.audio_frames)
+        return to_float(frames)
+
+def to_float(frames):
+    if not frames:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(frames).astype(np.float32) / 32768.0
+
+def transcribe(audio, prompt=None):
+    return load_whisper().transcribe(audio, fp16=False, initial_prompt=prompt)["text"].strip()
+
+def show_report_section(section):
+    """
+    Renders one drift report section as its own HTML component; through
+    st.markdown the indented HtmlDiff tables would come out as code blocks.
+    """
+    height = min(600, 60 + 18 * section.count("<tr"))
+    st.components.v1.html(REPORT_STYLE + section, height=height, scrolling=True)
+
+def flush_live(transcript, pending):
+    """
+    Transcribes the buffered frames (continuing from the last few sentences)
+    and appends the text to the live transcript.
+    """
+    if pending:
+        audio = to_float(pending)
+        pending.clear()
+        text = transcribe(audio, prompt=" ".join(transcript[-3:]) or None)
+        if text:
+            transcript.append(text)
 
+# Session state for chat
+if "chat_history" not in st.session_state:
+    st.session_state.chat_history = []
 
-
-    st.set_page_config(page_title="Local AI Crew", layout="wide")
-    st.title("🧠 Local AI Assistant")
-
-    # Tabs
-    tabs = st.tabs(["Chat", "MCM Diff Viewer"])
-
-    # Tab 1: Chat UI placeholder (to be integrated)
-    with tabs[0]:
-        st.subheader("Chat with your agents")
-        st.info("Voice/chat interface coming soon...")
-
-    # Tab 2: MCM Diff Viewer
-    with tabs[1]:
-        st.subheader("🧩 MCM Codebase Diff Tool")
-
-        repo_path = Path('/Users/justinrobinson/Documents/hyvemobile/repos/mcm.v3')
-        target_branch = st.text_input("Branch to compare:", value="domains/ng.mycontent.mobi")
-        reference_branch = st.text_input("Reference branch:", value="default-integration")
-        limit = st.slider("Max number of files to diff:", min_value=1, max_value=100, value=20)
-
-        if st.button("🔍 Generate Diff Report"):
+tabs = st.tabs(["Chat", "MCM Diff Viewer"])
+
+# Tab 1: Chat
+with tabs[0]:
+    # Text input fallback
+    user_input = st.text_input("Ask a question about your codebase:")
+
+    # Microphone STT
+    st.markdown("---")
+    st.subheader("🎤 Or record your voice")
+    live = st.checkbox("Live transcription")
+    if live:
+        # Frames are pulled from the receiver by the loop below rather than buffered by a processor
+        webrtc_ctx = webrtc_streamer(
+            key="stt-live", mode=WebRtcMode.SENDONLY, audio_receiver_size=LIVE_RECEIVER_FRAMES,
+            media_stream_constraints={"audio": True, "video": False},
+        )
+    else:
+        webrtc_ctx = webrtc_streamer(
+            key="stt", audio_processor_factory=AudioProcessor, media_stream_constraints={"audio": True, "video": False}
+        )
+
+    # Live mode transcribes every few seconds of new audio while recording
+    if live and webrtc_ctx.audio_receiver:
+        live_text = st.empty()
+        transcript = st.session_state.live_transcript = []
+        # Kept in session state so a rerun that interrupts this loop (e.g. Stop) can still flush it
+        pending = st.session_state.live_pending = []
+        pending_samples = 0
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=WHISPER_RATE)
+        while True:
+            receiver = webrtc_ctx.audio_receiver
+            if receiver is None:
+                break
             try:
-                tool = MCMGitDiffTool(repo_path, reference_branch)
-                html = tool.diff_to_html(target_branch, limit=limit)
-                st.components.v1.html(html, height=1000, scrolling=True)
-            except Exception as e:
-                st.error(f"❌ Failed to generate diff: {e}")
-
+                frames = receiver.get_frames(timeout=1)
+            except queue.Empty:
+                break  # no audio for a second: the stream has stopped
+            for frame in frames:
+                for resampled in resampler.resample(frame):
+                    samples = resampled.to_ndarray().reshape(-1)
+                    pending.append(samples)
+                    pending_samples += len(samples)
+            if pending_samples >= LIVE_CHUNK_SECONDS * WHISPER_RATE:
+                flush_live(transcript, pending)
+                pending_samples = 0
+                live_text.markdown(f"🎙️ {' '.join(transcript)}")
+        flush_live(transcript, pending)
+        live_text.markdown(f"🎙️ {' '.join(transcript)}")
+    elif live and not webrtc_ctx.state.playing:
+        # Recording stopped: transcribe what was left over, then offer the transcript as the question
+        transcript = st.session_state.setdefault("live_transcript", [])
+        flush_live(transcript, st.session_state.get("live_pending", []))
+        if transcript:
+            live_question = " ".join(transcript)
+            st.markdown(f"🎙️ {live_question}")
+            if st.button("Ask this"):
+                user_input = live_question
+                st.session_state.live_transcript = []
+
+    if not live and st.button("Transcribe Voice") and webrtc_ctx.audio_processor:
+        audio = webrtc_ctx.audio_processor.audio()
+        if len(audio):
+            user_input = transcribe(audio)
+            st.success(f"You said: {user_input}")
+
+    # Process query if available
+    if user_input:
+        st.session_state.chat_history.append(("You", user_input))
+        architect_agent = get_agent("architect_agent")  # built on the first question, then reused
+        task = Task(description=user_input, agent=architect_agent)
+        crew = Crew(agents=[architect_agent], tasks=[task], verbose=False)
+        # Tokens and tool calls are drawn into this container while the crew runs
+        # (the request is scoped to this session's script run, not shared across sessions)
+        sink = StreamlitSink(st.empty())
+        try:
+            with get_stream_handler().request(sink) as request, st.spinner("Thinking..."):
+                response = crew.run()
+        finally:
+            sink.flush()
+        st.session_state.chat_history.append(("AI", response))
+        if request.ttft is not None:
+            st.caption(f"First token after {request.ttft:.1f}s ({request.tokens} tokens streamed)")
+        cache = get_retriever().stats()
+        st.caption(f"Retrieval cache: {cache['result_hit_rate']:.0%} result hits, "
+                   f"{cache['embedding_hit_rate']:.0%} embedding hits")
+
+        # Text-to-speech
+        engine = pyttsx3.init()
+        engine.say(response)
+        engine.runAndWait()
+
+    # Chat history display
+    st.markdown("---")
+    st.subheader("📝 Chat History")
+    for sender, message in st.session_state.chat_history:
+        st.markdown(f"**{sender}:** {message}")
+
+# Tab 2: MCM Diff Viewer
+with tabs[1]:
+    st.subheader("🧩 MCM Codebase Diff Tool")
+
+    repo_path = Path('/Users/justinrobinson/Documents/hyvemobile/repos/mcm.v3')
+    target_branch = st.text_input("Branch to compare:", value="domains/ng.mycontent.mobi")
+    reference_branch = st.text_input("Reference branch:", value="default-integration")
+    limit = st.slider("Max number of files to diff:", min_value=1, max_value=100, value=20)
+    context_only = st.checkbox("Changed hunks only", value=True)
+    max_lines = st.number_input("Max diff lines per file:", min_value=50, max_value=20000, value=500)
+    max_kb = st.number_input("Max report size (KB):", min_value=100, max_value=50000, value=2000)
+
+    if st.button("🔍 Generate Diff Report"):
+        try:
+            tool = MCMGitDiffTool(repo_path, reference_branch)
+            report = st.container()
+            # Render each file section as soon as it is diffed instead of waiting for the whole report
+            for section in tool.iter_report(target_branch, limit=limit,
+                                            mode="context" if context_only else "full",
+                                            max_lines_per_file=int(max_lines),
+                                            max_bytes=int(max_kb) * 1024):
+                with report:
+                    show_report_section(section)
+        except Exception as e:
+            st.error(f"❌ Failed to generate diff: {e}")
+
+    branch_pattern = st.text_input("Branch pattern for batch scan:", value="domains/*")
+    if st.button("🗺️ Scan All Matching Branches"):
+        try:
+            tool = MCMGitDiffTool(repo_path, reference_branch)
+            matrix = json.loads(tool.scan_branches(branch_pattern))
+            rows = [
+                {"branch": matrix["branches"][b]["name"], "file": matrix["files"][f],
+                 "added": added, "removed": removed}
+                for b, f, added, removed in matrix["cells"]
+            ]
+            st.caption(f"{len(matrix['branches'])} branches, {matrix['distinct_diffs']} distinct diffs "
+                       f"in {matrix['seconds']}s")
+            st.dataframe(rows, use_container_width=True)
+        except Exception as e:
+            st.error(f"❌ Failed to scan branches: {e}")
@@ -0,0 +1,171 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+class StreamEvent(NamedTuple):
+    kind: str  # "llm_start" | "token" | "llm_end" | "tool_start" | "tool_end"
+    source: str  # model name, or tool name for tool events
+    text: str
+    at: float
+
+
+# ─────────────────────────────────────────────────────────────
+# Stream Request: one question's sinks and time to first token
+# ─────────────────────────────────────────────────────────────
+class StreamRequest:
+    """
+    Sinks and counters for one question, created by
+    `StreamingCallbackHandler.request()`. `ttft` is measured from the
+    request's start to its first token.
+    """
+
+    def __init__(self, sinks: Sequence[Callable[[StreamEvent], None]] = ()):
+        self.sinks: List[Callable[[StreamEvent], None]] = list(sinks)
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def emit(self, kind: str, source: str, text: str) -> None:
+        event = StreamEvent(kind, source, text, time.perf_counter())
+        if kind == "token":
+            with self._lock:
+                self.tokens += 1
+                if self.ttft is None:
+                    self.ttft = event.at - self.started
+        for sink in self.sinks:
+            try:
+                sink(event)
+            except Exception:
+                pass  # a broken display must never fail the crew
+
+
+_current_request: ContextVar[Optional[StreamRequest]] = ContextVar("stream_request", default=None)
+
+
+# ─────────────────────────────────────────────────────────────
+# Streaming Callback Handler: LLM tokens and tool events -> current request
+# ─────────────────────────────────────────────────────────────
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """
+    One handler attached to every shared LLM client (and as every agent's
+    step callback). Each event goes to the StreamRequest active in the
+    calling context, so concurrent questions (e.g. two Streamlit sessions)
+    only see their own tokens. Events outside a request are dropped.
+
+    Threads do not inherit the context: code that runs agents on a worker
+    thread must carry it over with `contextvars.copy_context().run`.
+    """
+
+    @contextmanager
+    def request(self, *sinks: Callable[[StreamEvent], None]) -> Iterator[StreamRequest]:
+        stream = StreamRequest(sinks)
+        token = _current_request.set(stream)
+        try:
+            yield stream
+        finally:
+            _current_request.reset(token)
+
+    def _emit(self, kind: str, source: str, text: str) -> None:
+        stream = _current_request.get()
+        if stream is not None:
+            stream.emit(kind, source, text)
+
+    @staticmethod
+    def _model(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or (serialized or {}).get("kwargs") or {}
+        return str(params.get("model") or (serialized or {}).get("name") or "llm")
+
+    # LangChain callbacks
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self._emit("llm_start", self._model(serialized, kwargs), "")
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self._emit("token", "", token)
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        self._emit("llm_end", "", "")
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self._emit("tool_start", (serialized or {}).get("name", "tool"), str(input_str))
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self._emit("tool_end", "", str(output))
+
+    # crewai step callback: [(AgentAction, observation), ...] after each tool call
+    def on_agent_step(self, step: Any) -> None:
+        if not isinstance(step, list):
+            return
+        for item in step:
+            if isinstance(item, tuple) and len(item) == 2:
+                action, observation = item
+                self._emit("tool_start", str(getattr(action, "tool", "tool")), str(getattr(action, "tool_input", "")))
+                self._emit("tool_end", str(getattr(action, "tool", "tool")), str(observation))
+
+
+# ─────────────────────────────────────────────────────────────
+# Sinks
+# ─────────────────────────────────────────────────────────────
+class TerminalSink:
+    """
+    Writes tokens to stdout as they arrive, with a header whenever a new LLM
+    call starts and one line per tool call. Set `show_tokens` to False while
+    several agents run at once, so their tokens do not interleave.
+    """
+
+    def __init__(self, stream=None, max_tool_output: int = 200, show_tokens: bool = True):
+        self.stream = stream or sys.stdout
+        self.max_tool_output = max_tool_output
+        self.show_tokens = show_tokens
+
+    def __call__(self, event: StreamEvent) -> None:
+        if event.kind == "llm_start":
+            self.stream.write(f"\n\n💭 [{event.source}] ")
+        elif event.kind == "token":
+            if not self.show_tokens:
+                return
+            self.stream.write(event.text)
+        elif event.kind == "tool_start":
+            self.stream.write(f"\n🔧 {event.source}({event.text[:self.max_tool_output]})\n")
+        elif event.kind == "tool_end":
+            output = event.text.replace("\n", " ")
+            self.stream.write(f"   ↳ {output[:self.max_tool_output]}{'…' if len(output) > self.max_tool_output else ''}\n")
+        self.stream.flush()
+
+
+class StreamlitSink:
+    """
+    Renders the running transcript into a Streamlit placeholder
+    (`st.empty()`), redrawing at most every `interval` seconds. Call
+    `flush()` once the crew is done to draw the final state.
+
+    Streamlit elements can only be updated from the script thread, so events
+    from other threads are buffered and shown on the next redraw from it.
+    """
+
+    def __init__(self, placeholder, interval: float = 0.1):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.parts: List[str] = []
+        self._last_draw = 0.0
+        self._thread = threading.current_thread()
+
+    def __call__(self, event: StreamEvent) -> None:
+        if event.kind == "llm_start":
+            self.parts.append(f"\n\n**💭 {event.source}:** ")
+        elif event.kind == "token":
+            self.parts.append(event.text)
+        elif event.kind == "tool_start":
+            self.parts.append(f"\n\n`🔧 {event.source}({event.text[:200]})`\n\n")
+        if threading.current_thread() is self._thread and time.perf_counter() - self._last_draw >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.placeholder.markdown("".join(self.parts))
+        self._last_draw = time.perf_counter()
@@ -0,0 +1,29 @@
+from src.code_chunker import symbol_chunks
+
+SOURCE = """package com.example.application.service;
+public class S {
+    public void run() {
+        int alpha = 1;
+        int beta = 2;
+        System.out.println(alpha + beta);
+    }
+}
+"""
+
+
+def test_split_pieces_keep_source_order(tmp_path):
+    path = tmp_path / "S.java"
+    path.write_text(SOURCE)
+    lines = SOURCE.splitlines(keepends=True)
+    definition = "    public void run() {\n"
+
+    chunks = symbol_chunks(str(path), "java", max_chars=50, min_chars=80)
+    assert [meta["part"] for _, meta in chunks] == list(range(len(chunks)))
+    for text, meta in chunks:
+        body = "".join(lines[meta["start_line"] - 1:meta["end_line"]])
+        if meta["start_line"] > lines.index(definition) + 1:
+            # Continuations of the method repeat its definition line when it fits
+            assert text in (definition + body, body)
+        else:
+            assert text == body
+    assert chunks[1][0].startswith("public class S {")
@@ -0,0 +1,62 @@
+import subprocess
+
+import pytest
+
+from src.agent_tools import trigram_index
+from src.agent_tools.git_tool import GitTool
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # trigram databases go under ./.cache
+    repo = tmp_path / "code" / "app"
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.email", "dev@example.com")
+    git(repo, "config", "user.name", "dev")
+    (repo / "service.ts").write_text("export function committedOnly() {}\n")
+    git(repo, "add", "service.ts")
+    git(repo, "commit", "-q", "-m", "initial")
+    git(repo, "branch", "other")
+    return repo
+
+
+def test_unstaged_edit_is_found_by_grep_file(repo):
+    tool = GitTool(str(repo.parent))
+    assert tool.grep_file("app", "committedOnly")
+
+    (repo / "service.ts").write_text("export function addedLater() {}\n")
+    assert tool.grep_file("app", "addedLater") == ["app/service.ts:1: export function addedLater() {}"]
+    assert tool.grep_file("app", "committedOnly") == []
+
+
+def test_dirty_file_does_not_leak_into_ref_grep(repo):
+    (repo / "service.ts").write_text("export function addedLater() {}\n")
+    tool = GitTool(str(repo.parent))
+
+    # First sync sees the file dirty; the committed blob must still be indexed from the object store
+    assert tool.grep_file("app", "addedLater")
+    assert tool.grep_at_ref("app", "other", "committedOnly") == [
+        "app@other:service.ts:1: export function committedOnly() {}"]
+    assert tool.grep_at_ref("app", "other", "addedLater") == []
+
+
+def test_missing_path_with_space_is_not_found(repo):
+    tool = GitTool(str(repo.parent))
+    assert tool.read_file_at_ref("app", "main", "missing file.ts") == "❌ `missing file.ts` not found at `main` in `app`"
+    assert tool.read_file_at_ref("app", "main", "service.ts") == "export function committedOnly() {}\n"
+
+
+def test_large_files_are_scanned_directly(repo, monkeypatch):
+    monkeypatch.setattr(trigram_index, "MAX_FILE_BYTES", 64)
+    (repo / "bundle.ts").write_text("// generated\n" * 10 + "export const largeFileNeedle = 1;\n")
+    git(repo, "add", "bundle.ts")
+    git(repo, "commit", "-q", "-m", "bundle")
+    tool = GitTool(str(repo.parent))
+    assert tool.grep_file("app", "largeFileNeedle") == ["app/bundle.ts:11: export const largeFileNeedle = 1;"]
+    assert tool.grep_at_ref("app", "main", "largeFileNeedle") == [
+        "app@main:bundle.ts:11: export const largeFileNeedle = 1;"]
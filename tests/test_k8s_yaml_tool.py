@@ -0,0 +1,93 @@
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from src.agent_tools import k8s_yaml_tool
+from src.agent_tools.k8s_yaml_tool import ClusterSnapshot, K8sYAMLTool
+
+DUMP = str(Path(__file__).parent / "fixtures" / "k8s_dump.yaml")
+SECRET_VALUES = ("aHVudGVyMg==", "YXBw", "plain-text-token")
+
+
+@pytest.fixture
+def kubectl_calls(monkeypatch):
+    calls = []
+
+    def fake_check_output(cmd, **kwargs):
+        calls.append(cmd)
+        raise subprocess.TimeoutExpired(cmd, kwargs.get("timeout"))
+
+    monkeypatch.setattr(k8s_yaml_tool.subprocess, "check_output", fake_check_output)
+    return calls
+
+
+@pytest.fixture
+def tool(tmp_path, kubectl_calls):
+    return K8sYAMLTool(str(tmp_path), snapshot=True, snapshot_ttl=3600,
+                       snapshot_path=str(tmp_path / "snapshot.json"), snapshot_dump=DUMP)
+
+
+def test_describe_and_get_answer_from_the_dump(tool, kubectl_calls):
+    described = tool.describe("deploy/web", namespace="prod")
+    assert "Name:         web" in described
+    assert "Available=True MinimumReplicasAvailable" in described
+    assert "replicas: 2" in tool.get("deployments web")
+    assert "not in snapshot" in tool.get("svc/missing")
+    assert kubectl_calls == []
+
+
+def test_secret_values_never_reach_the_snapshot_file(tool, tmp_path):
+    stored = (tmp_path / "snapshot.json").read_text()
+    assert not any(value in stored for value in SECRET_VALUES)
+    assert "Data keys:    password, username" in tool.describe("secret/db-credentials")
+    assert not any(value in tool.get("secret/db-credentials") for value in SECRET_VALUES)
+
+
+def test_stale_dump_is_not_refreshed_from_kubectl(tmp_path, kubectl_calls):
+    dump = tmp_path / "dump.yaml"
+    shutil.copy(DUMP, dump)
+    old = time.time() - 7 * 86400
+    os.utime(dump, (old, old))
+    snapshot = ClusterSnapshot(str(tmp_path / "snapshot.json"), ttl=3600)
+    snapshot.import_dump(str(dump))
+
+    assert snapshot.is_stale()
+    assert snapshot.refresh() == "✅ Serving the imported dump"
+    assert "(stale)" in snapshot.header()
+    assert kubectl_calls == []
+
+
+def test_export_stops_at_the_first_failure(tmp_path, kubectl_calls):
+    snapshot = ClusterSnapshot(str(tmp_path / "snapshot.json"), ttl=3600)
+    assert "Could not export namespaces" in snapshot.refresh()
+    assert len(kubectl_calls) == 1
+    # Retried at most once per TTL
+    assert "failed recently" in snapshot.refresh()
+    assert len(kubectl_calls) == 1
+
+
+def test_snapshot_written_before_redaction_is_cleaned_on_load(tmp_path):
+    path = tmp_path / "snapshot.json"
+    path.write_text('{"taken_at": 1, "source": "kubectl", "items": '
+                    '[{"kind": "Secret", "metadata": {"name": "s"}, "data": {"password": "aHVudGVyMg=="}}]}')
+    snapshot = ClusterSnapshot(str(path))
+    assert snapshot.find("secret", "s")[0]["data"] == {"password": "<redacted>"}
+    assert "aHVudGVyMg==" not in path.read_text()
+
+
+def test_ies_plurals_and_null_kinds_in_a_multi_document_dump(tmp_path, kubectl_calls):
+    dump = tmp_path / "dump.yaml"
+    dump.write_text("kind: null\n"
+                    "---\n"
+                    "apiVersion: networking.k8s.io/v1\n"
+                    "kind: NetworkPolicy\n"
+                    "metadata:\n  name: deny-all\n  namespace: prod\n"
+                    "spec:\n  podSelector: {}\n")
+    tool = K8sYAMLTool(str(tmp_path), snapshot=True, snapshot_ttl=3600,
+                       snapshot_path=str(tmp_path / "snapshot.json"), snapshot_dump=str(dump))
+    assert "podSelector" in tool.get("networkpolicies/deny-all", namespace="prod")
+    assert "podSelector" in tool.get("networkpolicy deny-all", namespace="prod")
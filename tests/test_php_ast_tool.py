@@ -0,0 +1,63 @@
+from src.agent_tools.ast.php_ast_tool import PHPASTTool, extract_symbols
+
+MIXED = """<html>
+<body>
+<p>Don't panic, this is only HTML.</p>
+<?php
+class UserRepo {
+    public function find($id) {
+        return helperFn($id);
+    }
+}
+?>
+<p>Not parsed either.</p>
+<?php
+function helperFn($id) { return 'id:' . $id; }
+"""
+
+HEREDOC = """<?php
+function beforeHeredoc() {
+    $sql = <<<SQL
+    SELECT * FROM users WHERE name = 'O'Brien' -- it's here
+    SQL;
+    $raw = <<<'TXT'
+Don't interpolate {$this}
+TXT;
+    return afterHeredoc($sql . $raw);
+}
+
+function afterHeredoc($s) { return $s; }
+"""
+
+
+def names(symbols, kind):
+    return {name for k, name, _, _ in symbols if k == kind}
+
+
+def test_inline_html_apostrophes_do_not_start_strings(tmp_path):
+    path = tmp_path / "page.php"
+    path.write_text(MIXED)
+    symbols = extract_symbols(str(path))
+    assert names(symbols, "class") == {"UserRepo"}
+    assert names(symbols, "function") == {"find", "helperFn"}
+    assert ("call", "helperFn", "UserRepo::find", 7) in symbols
+    assert not names(symbols, "identifier") & {"panic", "only", "HTML", "parsed"}
+
+
+def test_heredoc_body_is_one_string(tmp_path):
+    path = tmp_path / "query.php"
+    path.write_text(HEREDOC)
+    symbols = extract_symbols(str(path))
+    assert names(symbols, "function") == {"beforeHeredoc", "afterHeredoc"}
+    assert ("call", "afterHeredoc", "beforeHeredoc", 9) in symbols
+    assert ("function", "afterHeredoc", "", 12) in symbols
+    assert not names(symbols, "identifier") & {"SELECT", "users", "interpolate"}
+
+
+def test_search_finds_functions_after_inline_html(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the symbol index goes under ./.cache
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "page.php").write_text(MIXED)
+    result = PHPASTTool(str(root), workers=1).search("helperFn")
+    assert "function `helperFn`" in result
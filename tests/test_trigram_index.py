@@ -0,0 +1,45 @@
+from src.agent_tools import trigram_index
+from src.agent_tools.trigram_index import TrigramIndex, required_literals, trigrams
+
+
+def test_plain_pattern_is_its_own_literal():
+    assert required_literals("getUserById", regex=False) == ["getUserById"]
+
+
+def test_regex_literal_runs_are_split_by_operators():
+    assert required_literals(r"foo.*bar", regex=True) == ["foo", "bar"]
+    assert required_literals(r"class\s+UserService", regex=True) == ["class", "UserService"]
+    assert required_literals(r"\.java", regex=True) == [".java"]
+
+
+def test_optional_and_grouped_parts_are_not_required():
+    assert required_literals(r"ab*c", regex=True) == ["a", "c"]
+    assert required_literals(r"(foo|bar)Service", regex=True) == ["Service"]
+    assert required_literals(r"foo|bar", regex=True) == []
+
+
+def test_invalid_regex_narrows_nothing():
+    assert required_literals(r"foo(", regex=True) == []
+
+
+def test_candidates_intersect_trigrams(tmp_path):
+    index = TrigramIndex(str(tmp_path / "repo"), str(tmp_path / "trigram.sqlite"))
+    blobs = {"a": b"class UserService {}", "b": b"class OrderService {}", "c": b"unrelated"}
+    index.sync("main", "1", [("a.ts", "a"), ("b.ts", "b"), ("c.ts", "c")],
+               lambda batch: [blobs[sha] for _, sha in batch])
+
+    assert index.candidates("main", "userservice") == [("a.ts", "a")]
+    assert index.candidates("main", r"class\s+\w+Service", regex=True) == [("a.ts", "a"), ("b.ts", "b")]
+    assert index.candidates("main", "ab") == [("a.ts", "a"), ("b.ts", "b"), ("c.ts", "c")]
+    assert trigrams(b"ABCD") == trigrams(b"abcd")
+
+
+def test_files_too_large_to_index_are_always_candidates(tmp_path, monkeypatch):
+    monkeypatch.setattr(trigram_index, "MAX_FILE_BYTES", 64)
+    index = TrigramIndex(str(tmp_path / "repo"), str(tmp_path / "trigram.sqlite"))
+    blobs = {"a": b"class UserService {}", "big": b"x" * 100 + b" needleInLargeFile", "bin": b"\0needle"}
+    index.sync("main", "1", [("a.ts", "a"), ("big.ts", "big"), ("bin.ts", "bin")],
+               lambda batch: [blobs[sha] for _, sha in batch])
+
+    assert index.candidates("main", "needleInLargeFile") == [("big.ts", "big")]
+    assert index.candidates("main", "userservice") == [("a.ts", "a"), ("big.ts", "big")]